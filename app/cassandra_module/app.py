@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 import logging
-import os
-import uuid
 import random
-from datetime import datetime
-from cassandra.cluster import Cluster
-from datetime import datetime
-from cassandra.policies import RoundRobinPolicy
+from cassandra_module import resources
+from cassandra_module.migrate import migrate_users, read_email_mapping
+from cassandra_module.purge import purge_users, read_emails
+from cassandra_module.cluster import get_session
+from cassandra_module.course_stats import rows_values, summarize
+from cassandra_module.loader import create_schema, load_cassandra_data
+from cassandra_module.statements import MENU_STATEMENTS, prepare_statements
+from cassandra_module.writer import print_report
 
 # Set logger
 log = logging.getLogger()
@@ -15,10 +17,7 @@ handler = logging.FileHandler('plataforma_estudiantes.log')
 handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
 log.addHandler(handler)
 
-# Read env vars related to Cassandra
-CLUSTER_IPS = os.getenv('CASSANDRA_CLUSTER_IPS', 'localhost')
-KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'plataforma_online')
-REPLICATION_FACTOR = os.getenv('CASSANDRA_REPLICATION_FACTOR', '1')
+# La configuración (CASSANDRA_CLUSTER_IPS, CASSANDRA_KEYSPACE, ...) se lee en cluster.py
 
 def print_menu():
     mm_options = {
@@ -33,7 +32,7 @@ def print_menu():
         8: "Ver recordatorios de tareas",
         9: "Ver vistas del curso",
         10: "Ver instructores destacados",
-        11: "Cambiar email de usuario",
+        11: "Cambiar o migrar email de usuario",
         12: "Eliminar todos los registros del usuario",
         13: "Salir",
     }
@@ -45,94 +44,49 @@ def set_user_email():
     log.info(f"Email de usuario configurado como {user_email}")
     return user_email
 
-# Poblar los datos de prueba o desde CSV
+# Poblar los datos desde el CSV con el loader: carga completa (TRUNCATE de
+# todas sus tablas) con la agregación del leaderboard y los contadores de
+# vistas que leen las opciones 9 y 10. Vacía la cache al terminar.
 def populate_data(session,user_email):
-    log.info("Eliminando datos anteriores...")
-    session.execute("""
-        TRUNCATE student_activity;
-    """)
-    session.execute("""
-        TRUNCATE course_progress;
-    """)
-    session.execute("""
-        TRUNCATE system_notifications;
-    """)
-    session.execute("""
-        TRUNCATE user_sessions;
-    """)
-    session.execute("""
-        TRUNCATE certificates;
-    """)
-    session.execute("""
-        TRUNCATE course_performance;
-    """)
-    session.execute("""
-        TRUNCATE login_logs;
-    """)
-    session.execute("""
-        TRUNCATE task_reminders;
-    """)
-    session.execute("""
-        TRUNCATE course_views;
-    """)
-    session.execute("""
-        TRUNCATE top_instructors;
-    """)
-    # Importar el modelo y ejecutar la función
-    import importlib.util
-    import os
-    script_dir = os.path.dirname(__file__)
-    model_path = os.path.join(script_dir, "model.py")
-    spec = importlib.util.spec_from_file_location("model", model_path)
-    model = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(model)
-    # Llamar a la función para poblar datos
-    model.populate_data_from_csv(session, '../data/cassandra/test.csv')
+    load_cassandra_data('../data/cassandra/test.csv')
     print("Datos de prueba insertados correctamente")
 
-# Selects para cada tabla
+# Imprime una página a la vez; la siguiente se pide al servidor con el cursor
+# de la anterior, así que nunca se carga el historial completo en memoria
+def print_pages(fetch, format_row):
+    cursor = None
+    while True:
+        rows, cursor = fetch(cursor)
+        for row in rows:
+            print(format_row(row))
+        if not cursor or input("¿Ver más? (s/n): ").strip().lower() != 's':
+            return
+
+# Selects para cada tabla; las consultas viven en resources.py y aquí sólo
+# se piden los datos al usuario y se imprimen los resultados
 def view_activities(session, user_email,option,fecha_inicio=None, fecha_fin=None):
-    if option == 1:
-        try:
-            fecha_inicio = input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
-            fecha_fin = input("Ingrese la fecha de fin (YYYY-MM-DD): ") 
-            rows = session.execute("""
-                SELECT tipo_actividad, timestamp, activity_id, detalles
-                    FROM student_activity
-                    WHERE user_email = %s AND timestamp >= %s AND timestamp <= %s
-            """, (user_email,fecha_inicio, fecha_fin))
-        except Exception as e:
-            log.error(f"Error al obtener actividades por rango de fechas: {e}")
-            print("Error al obtener actividades por rango de fechas")
+    try:
+        if option == 1:
+            fecha_inicio = fecha_inicio or input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
+            fecha_fin = fecha_fin or input("Ingrese la fecha de fin (YYYY-MM-DD): ")
+        elif option == 2:
+            fecha_inicio = fecha_fin = None
+        else:
+            print("Opción inválida, por favor intente de nuevo")
             return
-    elif option == 2:
-        rows = session.execute("""
-            SELECT tipo_actividad, timestamp, activity_id, detalles
-            FROM student_activity
-            WHERE user_email = %s
-        """, (user_email,))
-    else:
-        print("Opción inválida, por favor intente de nuevo")
-        return
-    
-    print("Actividades del estudiante:")
-    for row in rows:
-        print(f"ID: {row.activity_id}, Tipo: {row.tipo_actividad}, Fecha: {row.timestamp}, Detalles: {row.detalles}")
+        print("Actividades del estudiante:")
+        print_pages(lambda cursor: resources.pagina_actividades(session, user_email, fecha_inicio, fecha_fin, cursor=cursor),
+                    lambda row: f"ID: {row.activity_id}, Tipo: {row.tipo_actividad}, Fecha: {row.timestamp}, Detalles: {row.detalles}")
+    except Exception as e:
+        log.error(f"Error al obtener actividades por rango de fechas: {e}")
+        print("Error al obtener actividades por rango de fechas")
 
 def view_progress(session, user_email,option):
     if option == 1:
-        rows = session.execute("""
-            SELECT course_id, progress_percent, grade
-            FROM course_progress
-            WHERE user_email = %s
-        """, (user_email,))
+        rows = resources.obtener_progreso(session, user_email)
     elif option == 2:
         course = input("Ingrese el ID del curso: ")
-        rows = session.execute("""
-            SELECT course_id, progress_percent, grade
-            FROM course_progress
-            WHERE user_email = %s AND course_id = %s
-        """, (user_email,course))
+        rows = resources.obtener_progreso(session, user_email, course)
     else:
         print("Opción inválida, por favor intente de nuevo")
         return
@@ -144,48 +98,27 @@ def view_progress(session, user_email,option):
 def view_notifications(session, user_email,option,fecha_inicio=None,fecha_fin=None):
     try:
         if option == 1:
-            rows = session.execute("""
-                SELECT timestamp, notification_id, course_id, tipo, notificacion
-                FROM system_notifications
-                WHERE user_email = %s
-            """, (user_email,))
+            fecha_inicio = fecha_fin = None
         elif option == 2:
-            fecha_inicio = input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
-            fecha_fin = input("Ingrese la fecha de fin (YYYY-MM-DD): ") 
-            rows = session.execute("""
-                SELECT timestamp, notification_id, course_id, tipo, notificacion
-                FROM system_notifications
-                WHERE user_email = %s AND timestamp >= %s AND timestamp <= %s
-            """, (user_email,fecha_inicio, fecha_fin))
+            fecha_inicio = fecha_inicio or input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
+            fecha_fin = fecha_fin or input("Ingrese la fecha de fin (YYYY-MM-DD): ")
         else:
             print("Opción inválida, por favor intente de nuevo")
             return
+        print(f"Notificaciones del sistema para {user_email}:")
+        print_pages(lambda cursor: resources.pagina_notificaciones(session, user_email, fecha_inicio, fecha_fin, cursor=cursor),
+                    lambda row: f"ID: {row.notification_id}, Fecha: {row.timestamp}, Curso: {row.course_id}, Tipo: {row.tipo}, Mensaje: {row.notificacion}")
     except Exception as e:
         log.error(f"Error al obtener notificaciones: {e}")
         print("Error al obtener notificaciones")
-        return
-
-    
-    print(f"Notificaciones del sistema para {user_email}:")
-    for row in rows:
-        print(f"ID: {row.notification_id}, Fecha: {row.timestamp}, Curso: {row.course_id}, Tipo: {row.tipo}, Mensaje: {row.notificacion}")
 
 def view_user_sessions(session, user_email,option):
     try:
         if option == 1:
-            rows = session.execute("""
-                SELECT session_id, device_info, last_activity
-                FROM user_sessions
-                WHERE user_email = %s
-            """, (user_email,))
+            rows = resources.obtener_sesiones(session, user_email)
         elif option == 2:
             session_id = input("Ingrese el ID de la sesión: ")
-            session_id = uuid.UUID(session_id)
-            rows = session.execute("""
-                SELECT session_id, device_info, last_activity
-                FROM user_sessions
-                WHERE user_email = %s AND session_id = %s
-            """, (user_email,session_id))
+            rows = resources.obtener_sesiones(session, user_email, session_id)
         else:
             print("Opción inválida, por favor intente de nuevo")
             return
@@ -200,20 +133,11 @@ def view_user_sessions(session, user_email,option):
 
 def view_certificates(session, user_email,option):
     if option == 1:
-        rows = session.execute("""
-            SELECT completion_date, certificate_id, course_id, student_name, course_title, certificate_url
-            FROM certificates
-            WHERE user_email = %s
-        """, (user_email,))
+        rows = resources.obtener_certificados(session, user_email)
     elif option == 2:
         fecha_str = input("Ingrese la fecha del certificado: ")
         try:
-            fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-            rows = session.execute("""
-                SELECT completion_date, certificate_id, course_id, student_name, course_title, certificate_url
-                FROM certificates
-                WHERE user_email = %s AND completion_date = %s
-            """, (user_email,fecha))
+            rows = resources.obtener_certificados(session, user_email, fecha_str)
         except Exception as e:
             log.error(f"Error al obtener certificados por fecha: {e}")
             print("Error al obtener certificados por fecha")
@@ -229,62 +153,48 @@ def view_certificates(session, user_email,option):
 
 def view_course_progress(session, course_id):
     try:
-        rows = session.execute("""
-            SELECT user_email, progress_percent, grade
-            FROM course_performance
-            WHERE course_id = %s
-        """, (course_id,))
+        rows = resources.obtener_desempeno_curso(session, course_id)
         
         print("Progreso del curso del estudiante:")
         for row in rows:
             print(f"Email: {row.user_email}, Progreso: {row.progress_percent}%, Calificación: {row.grade}")
+
+        # Resumen de las mismas filas impresas arriba (cacheadas), sin releer la partición
+        stats = summarize(course_id, rows_values(rows))
+        if stats["students"]:
+            percentiles = ", ".join(f"p{p}: {v:.2f}" for p, v in stats["grade_percentiles"].items())
+            histogram = ", ".join(f"{rango}%: {n}" for rango, n in stats["progress_histogram"].items())
+            print(f"Estudiantes: {stats['students']}, Calificación promedio: {stats['grade_mean']:.2f}, Mediana: {stats['grade_median']:.2f}")
+            print(f"Percentiles de calificación: {percentiles}")
+            print(f"Progreso promedio: {stats['progress_mean']:.1f}%, Distribución: {histogram}")
+            print(f"Estudiantes en riesgo: {stats['at_risk']}")
     except Exception as e:
         log.error(f"Error al obtener el progreso del curso: {e}")
         print("Error al obtener el progreso del curso")
 def view_login_logs(session, user_email,option ,fecha_inicio=None,fecha_fin=None):
     try:
         if option == 1:
-            rows = session.execute("""
-                SELECT last_activity, session_id, start_time, device_info, active_status
-                FROM login_logs
-                WHERE user_email = %s
-            """, (user_email,))
+            fecha_inicio = fecha_fin = None
         elif option == 2:
-            fecha_inicio = input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
-            fecha_fin = input("Ingrese la fecha de fin (YYYY-MM-DD): ")
-            rows = session.execute("""
-                SELECT last_activity, session_id, start_time, device_info, active_status
-                FROM login_logs
-                WHERE user_email = %s AND last_activity >= %s AND last_activity <= %s
-            """, (user_email,fecha_inicio, fecha_fin))
+            fecha_inicio = fecha_inicio or input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
+            fecha_fin = fecha_fin or input("Ingrese la fecha de fin (YYYY-MM-DD): ")
         else:
             print("Opción inválida, por favor intente de nuevo")
             return
+        print("Logs de inicio de sesión del estudiante:")
+        print_pages(lambda cursor: resources.pagina_logs_inicio(session, user_email, fecha_inicio, fecha_fin, cursor=cursor),
+                    lambda row: f"ID: {row.session_id}, Última actividad: {row.last_activity}, Hora de inicio: {row.start_time}, Dispositivo: {row.device_info}, Estado activo: {row.active_status}")
     except Exception as e:
         log.error(f"Error al obtener logs de inicio de sesión: {e}")
         print("Error al obtener logs de inicio de sesión")
-        return
-    
-    print("Logs de inicio de sesión del estudiante:")
-    for row in rows:
-        print(f"ID: {row.session_id}, Última actividad: {row.last_activity}, Hora de inicio: {row.start_time}, Dispositivo: {row.device_info}, Estado activo: {row.active_status}")
 
 def view_tasks(session, user_email,option):
     try:
         if option == 1:
-            rows = session.execute("""
-                SELECT task_id, task_description, due_date, is_completed
-                FROM task_reminders
-                WHERE user_email = %s
-            """, (user_email,))
+            rows = resources.obtener_tareas(session, user_email)
         elif option == 2:
             task_id = input("Ingrese el ID de la tarea: ")
-            task_id = uuid.UUID(task_id)
-            rows = session.execute("""
-                SELECT task_id, task_description, due_date, is_completed
-                FROM task_reminders
-                WHERE user_email = %s AND task_id = %s
-            """, (user_email,task_id))
+            rows = resources.obtener_tareas(session, user_email, task_id)
         else:
             print("Opción inválida, por favor intente de nuevo")
             return
@@ -297,77 +207,100 @@ def view_tasks(session, user_email,option):
     for row in rows:
         print(f"ID: {row.task_id}, Descripción: {row.task_description}, Fecha de vencimiento: {row.due_date}, Completado: {row.is_completed}")
 
-def view_course_views(session, course):
-    rows = session.execute("""
-        SELECT view_date, views
-        FROM course_views
-        WHERE course_id = %s
-    """, (course,))
-    
+def view_course_views(session, course, fecha_inicio=None, fecha_fin=None):
+    # Sólo se leen los buckets diarios del rango pedido
+    try:
+        fecha_inicio = fecha_inicio or input("Ingrese la fecha de inicio (YYYY-MM-DD): ")
+        fecha_fin = fecha_fin or input("Ingrese la fecha de fin (YYYY-MM-DD): ")
+        rows = resources.obtener_vistas_curso(session, course, fecha_inicio, fecha_fin)
+    except Exception as e:
+        log.error(f"Error al obtener vistas del curso: {e}")
+        print("Error al obtener vistas del curso")
+        return
+
     print("Vistas del curso:")
-    for row in rows:
-        print(f"Fecha: {row.view_date}, Vistas: {row.views}")
+    if not rows:
+        print("No hay vistas registradas en ese rango.")
+    for day, hour, views in rows:
+        print(f"Fecha: {day} {hour:02d}:00, Vistas: {views}")
 
-def view_Teachers(session):
-    rows = session.execute("""
-        SELECT instructor_email, instructor_name, avg_rating, total_courses
-        FROM top_instructors
-    """)
+def view_Teachers(session, limit=10):
+    rows = resources.obtener_top_instructores(session, limit)
 
-    sorted_rows = sorted(rows, key=lambda row: row.avg_rating, reverse=True)
-    
     print("Instructores destacados:")
-    if not sorted_rows:
+    if not rows:
         print("No hay instructores destacados disponibles.")
     else:
-        for row in sorted_rows:
+        for row in rows:
             print(f"Email: {row.instructor_email}, Nombre: {row.instructor_name}, Calificación promedio: {row.avg_rating}, Cursos totales: {row.total_courses}")
 
 def delete_user_data(session, user_email):
-    log.info(f"Eliminando todos los registros del usuario: {user_email}")
-    
-    tablas_con_user_email = [
-        "student_activity",
-        "course_progress",
-        "system_notifications",
-        "user_sessions",
-        "certificates",
-        "login_logs",
-        "task_reminders"
-    ]
-    
-    for tabla in tablas_con_user_email:
-        try:
-            query = f"DELETE FROM {tabla} WHERE user_email = %s"
-            session.execute(query, (user_email,))
-            log.info(f"Eliminados registros de la tabla '{tabla}' para {user_email}")
-        except Exception as e:
-            log.error(f"Error al eliminar de {tabla}: {e}")
-    
-    print(f"Todos los registros de {user_email} han sido eliminados.")
-
-def main():
-    log.info("Conectando a Cassandra")
-    cluster = Cluster(CLUSTER_IPS.split(','), load_balancing_policy=RoundRobinPolicy(), protocol_version=5)
-    session = cluster.connect()
+    # Purga concurrente; también borra las filas del usuario en course_performance
+    print("1. Eliminar los registros del usuario actual")
+    print("2. Eliminar los usuarios listados en un archivo (un email por línea)")
+    option = int(input('Ingrese su opción: '))
+    if option == 1:
+        emails = [user_email]
+    elif option == 2:
+        emails = read_emails(input("Ruta del archivo: ").strip())
+    else:
+        print("Opción inválida, por favor intente de nuevo")
+        return
 
-    # Crear keyspace si no existe
-    session.execute(f"""
-    CREATE KEYSPACE IF NOT EXISTS {KEYSPACE}
-    WITH replication = {{ 'class': 'SimpleStrategy', 'replication_factor': {REPLICATION_FACTOR} }};
-    """)
-    session.set_keyspace(KEYSPACE)
+    log.info(f"Eliminando todos los registros de {len(emails)} usuario(s)")
+    stats = purge_users(session, emails)
+    print_report(stats)
+    if any(counts["error"] for counts in stats.values()):
+        print("Algunos registros no se pudieron eliminar; revise el log y vuelva a intentarlo.")
+    else:
+        print(f"Todos los registros de {len(emails)} usuario(s) han sido eliminados.")
 
-    # Importar el modelo desde la misma carpeta que este archivo
-    import os
-    import importlib.util
+def change_user_email(session, user_email):
+    # Devuelve el email con el que sigue trabajando el menú
+    print("1. Cambiar el usuario activo")
+    print("2. Migrar los registros del usuario actual a un nuevo email")
+    print("3. Migrar usuarios desde un archivo CSV (email_anterior,email_nuevo)")
+    option = int(input('Ingrese su opción: '))
+    if option == 1:
+        return set_user_email()
+    if option == 2:
+        new_email = input("Nuevo email: ").strip()
+        if new_email == user_email:
+            print("El nuevo email es igual al actual; no hay nada que migrar.")
+            return user_email
+        pairs = [(user_email, new_email)]
+    elif option == 3:
+        pairs = read_email_mapping(input("Ruta del archivo: ").strip())
+    else:
+        print("Opción inválida, por favor intente de nuevo")
+        return user_email
 
-    script_dir = os.path.dirname(__file__)  # carpeta actual de app.py
-    model_path = os.path.join(script_dir, "model.py")
+    log.info(f"Migrando {len(pairs)} usuario(s) a un nuevo email")
+    try:
+        copy_stats, purge_stats, failed = migrate_users(session, pairs)
+    except ValueError as e:
+        print(f"No se migró ningún usuario: {e}")
+        return user_email
+    print("Copia:")
+    print_report(copy_stats)
+    print("Borrado de los emails anteriores:")
+    print_report(purge_stats)
+    for old, new in failed:
+        print(f"No se pudo migrar {old} -> {new}; sus datos anteriores se conservan.")
+    if option == 2 and not failed:
+        log.info(f"Email de usuario configurado como {new_email}")
+        return new_email
+    return user_email
 
-    spec = importlib.util.spec_from_file_location("model", model_path)
-    model = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(model)
+def main():
+    # Sesión compartida con perfiles token-aware; crea el keyspace si no existe
+    session = get_session()
+    # Las tablas del loader (leaderboard, contadores de vistas, tablas por mes
+    # e índices) pueden faltar en un keyspace creado por una versión anterior
+    # o todavía vacío; sin ellas no se pueden preparar las consultas del menú
+    create_schema(session)
+    # Preparar una sola vez todas las consultas del menú
+    prepare_statements(session, MENU_STATEMENTS)
 
     # Ya no se ejecuta model.create_schema(session)
     # Ya no se borra la tabla course_performance
@@ -431,7 +364,7 @@ def main():
         elif option == 10:
             view_Teachers(session)
         elif option == 11:
-            user_email = set_user_email()
+            user_email = change_user_email(session, user_email)
         elif option == 12:
             delete_user_data(session, user_email)
         elif option == 13:
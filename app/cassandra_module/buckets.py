@@ -0,0 +1,65 @@
+import logging
+from collections import deque
+from datetime import datetime
+from cassandra_module.cluster import PROFILE_INTERACTIVE_READ
+from cassandra_module.statements import get_statement
+
+log = logging.getLogger(__name__)
+
+# Tablas particionadas por (user_email, month) y la sentencia que las lee
+BUCKETED_TABLES = {
+    "student_activity_by_month": "select_activities_by_month",
+    "login_logs_by_month": "select_login_logs_by_month",
+}
+
+DEFAULT_LIMIT = 50
+# Meses que se consultan en paralelo por delante del que se está leyendo
+DEFAULT_BUCKET_CONCURRENCY = 4
+
+# Límites del rango cuando se pide el historial completo
+MIN_TIMESTAMP = datetime(1970, 1, 1)
+MAX_TIMESTAMP = datetime(9999, 12, 31, 23, 59, 59)
+
+
+def month_bucket(timestamp):
+    return f"{timestamp.year:04d}-{timestamp.month:02d}"
+
+
+def user_months(session, user_email, tabla):
+    # Meses con datos del usuario según user_buckets, ya en orden descendente
+    rows = session.execute(get_statement(session, "select_user_buckets"), (user_email, tabla),
+                           execution_profile=PROFILE_INTERACTIVE_READ)
+    return [row.month for row in rows]
+
+
+def fetch_bucketed(session, tabla, user_email, start=None, end=None, limit=DEFAULT_LIMIT,
+                   concurrency=DEFAULT_BUCKET_CONCURRENCY):
+    # Lee hasta `limit` filas del usuario en [start, end] (datetimes) de una
+    # tabla por mes. Se consultan varios meses a la vez, pero los resultados
+    # se consumen del mes más reciente al más antiguo: como los meses no se
+    # solapan y cada partición ya viene en orden descendente, concatenarlos
+    # mantiene el orden de clustering. En cuanto se junta el límite no se
+    # piden más meses. Sólo se consultan los meses del rango que tienen datos
+    # según user_buckets, no todos los meses del calendario.
+    statement = get_statement(session, BUCKETED_TABLES[tabla])
+    start, end = start or MIN_TIMESTAMP, end or MAX_TIMESTAMP
+    first, last = month_bucket(start), month_bucket(end)
+    months = [month for month in user_months(session, user_email, tabla) if first <= month <= last]
+
+    pending = deque()
+    remaining = iter(months)
+
+    def launch():
+        month = next(remaining, None)
+        if month is not None:
+            pending.append(session.execute_async(statement, (user_email, month, start, end, limit),
+                                                 execution_profile=PROFILE_INTERACTIVE_READ))
+
+    for _ in range(concurrency):
+        launch()
+    results = []
+    while pending and len(results) < limit:
+        results.extend(pending.popleft().result())
+        launch()
+    return results[:limit]
+
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+# Segundos que una lectura cacheada se considera vigente
+DEFAULT_TTL = 300
+# Máximo de consultas guardadas; al pasarlo se descarta la menos usada
+DEFAULT_MAX_ENTRIES = 1024
+# Máximo de filas entre todas las consultas guardadas: el número de entradas
+# no acota la memoria, porque una sola (p. ej. el desempeño de un curso
+# grande) puede tener cualquier cantidad de filas
+DEFAULT_MAX_ROWS = 50000
+
+
+def _size(value):
+    # Filas de un resultado; cualquier otro valor cuenta como una
+    try:
+        return len(value)
+    except TypeError:
+        return 1
+
+
+class TTLCache:
+    # LRU en memoria con expiración por entrada. Las claves son tuplas que
+    # empiezan con el nombre de la tabla, p. ej. ("course_progress", email, curso),
+    # para poder invalidar por usuario o por curso. Se descartan las menos
+    # usadas al pasar `max_entries` consultas o `max_rows` filas en total; un
+    # resultado con más de `max_rows` filas se devuelve pero no se guarda.
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, max_rows=DEFAULT_MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def _discard(self, key):
+        self._rows -= self._entries.pop(key)[2]
+
+    def get(self, key):
+        # Devuelve (True, valor) o (False, None) si no está o ya expiró
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        size = _size(value)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            if size > self.max_rows:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._discard(next(iter(self._entries)))
+
+    def get_or_load(self, key, load):
+        found, value = self.get(key)
+        if not found:
+            value = load()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, match):
+        # Descarta las claves para las que match(clave) es verdadero
+        with self._lock:
+            stale = [key for key in self._entries if match(key)]
+            for key in stale:
+                self._discard(key)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "rows": self._rows}
+
+
+# Cache de las lecturas de course_progress y course_performance, que sólo
+# cambian con una carga, una purga o una migración de email
+progress_cache = TTLCache()
+
+
+def invalidate_user(user_email):
+    return progress_cache.invalidate(lambda key: key[0] == "course_progress" and key[1] == user_email)
+
+
+def invalidate_course(course_id):
+    return progress_cache.invalidate(lambda key: key[0] == "course_performance" and key[1] == course_id)
+
+
+def invalidate_all():
+    progress_cache.clear()
+    log.info("Cache de progreso vaciada.")
@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+# Bitácora de avance de una carga: la primera línea describe el archivo y sus
+# shards, y cada línea siguiente registra el último offset (en bytes) de un
+# shard cuyas escrituras ya fueron confirmadas por Cassandra, junto con el
+# estado acumulado que el loader necesita para continuar. Es sólo de
+# anexar, así varios procesos pueden escribir en ella sin pisarse.
+
+
+class CheckpointJournal:
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def start(self, csv_path, shards):
+        header = {"file": os.path.abspath(csv_path), "size": os.path.getsize(csv_path),
+                  "shards": [list(shard) for shard in shards]}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + "\n")
+
+    def load(self, csv_path):
+        # Devuelve (shards, {shard: offset}, {shard: estado}) o None si la
+        # bitácora no sirve para este archivo
+        lines = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    lines.append(json.loads(line))
+                except ValueError:
+                    # Línea a medio escribir si el proceso murió durante el registro
+                    log.warning(f"Se ignora una línea incompleta de {self.path}.")
+        if not lines:
+            return None
+        header = lines[0]
+        if header.get("size") != os.path.getsize(csv_path):
+            log.warning(f"La bitácora {self.path} no corresponde al archivo actual; se ignora.")
+            return None
+        shards = [tuple(shard) for shard in header["shards"]]
+        offsets, states = {}, {}
+        for entry in lines[1:]:
+            shard = tuple(entry["shard"])
+            if entry["offset"] >= offsets.get(shard, shard[0]):
+                offsets[shard] = entry["offset"]
+                states[shard] = entry.get("state")
+        return shards, offsets, states
+
+    def record(self, shard, offset, state=None):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"shard": list(shard), "offset": offset, "state": state}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        if self.exists():
+            os.remove(self.path)
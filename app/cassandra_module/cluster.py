@@ -0,0 +1,130 @@
+import logging
+import os
+from cassandra import ConsistencyLevel
+from cassandra.cluster import EXEC_PROFILE_DEFAULT, Cluster, ExecutionProfile
+from cassandra.query import tuple_factory
+from cassandra.policies import ConstantSpeculativeExecutionPolicy, DCAwareRoundRobinPolicy, HostDistance, TokenAwarePolicy
+
+log = logging.getLogger(__name__)
+
+# Configuración común de Cassandra para todos los puntos de entrada
+CLUSTER_IPS = os.getenv('CASSANDRA_CLUSTER_IPS', '127.0.0.1')
+KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'plataforma_online')
+REPLICATION_FACTOR = os.getenv('CASSANDRA_REPLICATION_FACTOR', '1')
+LOCAL_DC = os.getenv('CASSANDRA_LOCAL_DC')  # None: el driver toma el DC del primer nodo
+
+# Perfiles de ejecución con nombre
+PROFILE_BULK_WRITE = "bulk_write"
+PROFILE_INTERACTIVE_READ = "interactive_read"
+PROFILE_ANALYTICS = "analytics"
+PROFILE_COLUMNAR = "columnar"
+
+CREATE_KEYSPACE = f"""
+CREATE KEYSPACE IF NOT EXISTS {KEYSPACE}
+WITH replication = {{ 'class': 'SimpleStrategy', 'replication_factor': {REPLICATION_FACTOR} }};
+"""
+
+
+def columnar_factory(column_names, rows):
+    # Row factory que entrega cada página ya transpuesta: una tupla de
+    # valores por columna, sin crear un objeto por fila
+    if not rows:
+        return []
+    return list(zip(*rows))
+
+
+class RangeAwarePolicy(TokenAwarePolicy):
+    # TokenAwarePolicy sólo enruta por routing_key (la clave de partición
+    # serializada). Las consultas por rango de tokens (scanner.py) no tienen
+    # una clave: llevan en `routing_token` el token final de su subrango y
+    # van primero a las réplicas locales que lo poseen.
+
+    def make_query_plan(self, working_keyspace=None, query=None):
+        token = getattr(query, "routing_token", None)
+        keyspace = query.keyspace if query is not None and query.keyspace else working_keyspace
+        token_map = self._cluster_metadata.token_map if token is not None else None
+        if not token_map or keyspace is None:
+            yield from super().make_query_plan(working_keyspace, query)
+            return
+        child = self._child_policy
+        replicas = token_map.get_replicas(keyspace, token_map.token_class(token))
+        for replica in replicas:
+            if replica.is_up and child.distance(replica) == HostDistance.LOCAL:
+                yield replica
+        for host in child.make_query_plan(keyspace, query):
+            if host not in replicas or child.distance(host) == HostDistance.REMOTE:
+                yield host
+
+
+def _token_aware():
+    # Cada petición va directo a una réplica de la partición (o del rango de
+    # tokens), sin saltos extra
+    return RangeAwarePolicy(DCAwareRoundRobinPolicy(local_dc=LOCAL_DC))
+
+
+def build_cluster(contact_points=None):
+    profiles = {
+        EXEC_PROFILE_DEFAULT: ExecutionProfile(
+            load_balancing_policy=_token_aware(),
+            request_timeout=10,
+        ),
+        # Cargas masivas: timeout largo y consistencia relajada
+        PROFILE_BULK_WRITE: ExecutionProfile(
+            load_balancing_policy=_token_aware(),
+            request_timeout=60,
+            consistency_level=ConsistencyLevel.LOCAL_ONE,
+        ),
+        # Consultas del menú: timeout corto y ejecución especulativa en otra
+        # réplica si la primera tarda (sólo aplica a sentencias idempotentes)
+        PROFILE_INTERACTIVE_READ: ExecutionProfile(
+            load_balancing_policy=_token_aware(),
+            request_timeout=2,
+            consistency_level=ConsistencyLevel.LOCAL_ONE,
+            speculative_execution_policy=ConstantSpeculativeExecutionPolicy(delay=0.05, max_attempts=2),
+        ),
+        # Lecturas masivas para estadísticas: filas como tuplas simples (sin
+        # crear un namedtuple por fila) y timeout largo para particiones grandes
+        PROFILE_ANALYTICS: ExecutionProfile(
+            load_balancing_policy=_token_aware(),
+            request_timeout=60,
+            consistency_level=ConsistencyLevel.LOCAL_ONE,
+            row_factory=tuple_factory,
+        ),
+        # Lecturas columnares (columnar.py): cada página llega por columnas
+        PROFILE_COLUMNAR: ExecutionProfile(
+            load_balancing_policy=_token_aware(),
+            request_timeout=60,
+            consistency_level=ConsistencyLevel.LOCAL_ONE,
+            row_factory=columnar_factory,
+        ),
+    }
+    return Cluster(
+        contact_points=contact_points or CLUSTER_IPS.split(','),
+        execution_profiles=profiles,
+        protocol_version=5,
+    )
+
+
+def ensure_keyspace(session):
+    session.execute(CREATE_KEYSPACE)
+
+
+def new_session():
+    # Sesión propia (p. ej. para un proceso del loader); quien la abre debe
+    # cerrarla con session.cluster.shutdown(). No se usa USE <keyspace>:
+    # todas las sentencias llevan el nombre de tabla completo.
+    session = build_cluster().connect()
+    ensure_keyspace(session)
+    return session
+
+
+_shared_session = None
+
+
+def get_session():
+    # Sesión compartida por el menú, la sincronización y las consultas
+    global _shared_session
+    if _shared_session is None or _shared_session.is_shutdown:
+        log.info("Conectando a Cassandra")
+        _shared_session = new_session()
+    return _shared_session
@@ -0,0 +1,73 @@
+import logging
+from array import array
+import numpy as np
+from cassandra_module.cluster import PROFILE_COLUMNAR
+from cassandra_module.statements import get_statement
+
+log = logging.getLogger(__name__)
+
+# Filas por página en las lecturas columnares
+DEFAULT_FETCH_SIZE = 5000
+
+# Tipo CQL -> código de array para guardar la columna sin objetos por valor;
+# las demás columnas (texto, uuid, fechas) quedan en listas
+ARRAY_TYPECODES = {
+    "int": "l",
+    "bigint": "q",
+    "counter": "q",
+    "smallint": "h",
+    "tinyint": "b",
+    "boolean": "b",
+    "float": "d",
+    "double": "d",
+}
+
+
+def _new_buffer(cql_type):
+    typecode = ARRAY_TYPECODES.get(getattr(cql_type, "typename", None))
+    return array(typecode) if typecode else []
+
+
+def _extend(buffer, values):
+    # Un nulo no cabe en un array: la columna pasa a ser lista (o NaN si es real)
+    if isinstance(buffer, array) and None in values:
+        if buffer.typecode == "d":
+            buffer.extend(float("nan") if v is None else v for v in values)
+            return buffer
+        buffer = buffer.tolist()
+    buffer.extend(values)
+    return buffer
+
+
+def read_columns(session, name, params=(), fetch_size=DEFAULT_FETCH_SIZE, as_numpy=False):
+    # Ejecuta la sentencia `name` del registro y devuelve {columna: valores}
+    # página por página: el perfil columnar entrega cada página transpuesta y
+    # aquí sólo se anexa a un búfer por columna. Con as_numpy=True las
+    # columnas numéricas se devuelven como arreglos de NumPy (sin copiar).
+    bound = get_statement(session, name).bind(params)
+    bound.fetch_size = fetch_size
+    result = session.execute(bound, execution_profile=PROFILE_COLUMNAR)
+    names = list(result.column_names or [])
+    buffers = [_new_buffer(cql_type) for cql_type in (result.column_types or [None] * len(names))]
+    while True:
+        for i, values in enumerate(result.current_rows):
+            buffers[i] = _extend(buffers[i], values)
+        if not result.has_more_pages:
+            break
+        result.fetch_next_page()
+    columns = dict(zip(names, buffers))
+    if as_numpy:
+        for column, buffer in columns.items():
+            if isinstance(buffer, array):
+                columns[column] = np.frombuffer(buffer, dtype=buffer.typecode) if len(buffer) else np.empty(0)
+    return columns
+
+
+# Lecturas analíticas de particiones completas
+
+def activity_columns(session, user_email, fetch_size=DEFAULT_FETCH_SIZE):
+    return read_columns(session, "select_activities", (user_email,), fetch_size)
+
+
+def course_performance_columns(session, course_id, fetch_size=DEFAULT_FETCH_SIZE, as_numpy=True):
+    return read_columns(session, "select_course_performance", (course_id,), fetch_size, as_numpy)
@@ -0,0 +1,84 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from cassandra_module.cluster import PROFILE_ANALYTICS
+from cassandra_module.statements import get_statement
+
+log = logging.getLogger(__name__)
+
+# Filas por página al recorrer course_performance
+DEFAULT_FETCH_SIZE = 5000
+# Cursos que se calculan en paralelo en el modo de varios cursos
+DEFAULT_COURSE_CONCURRENCY = 16
+
+# Umbrales para considerar a un estudiante en riesgo (calificación 0-10)
+AT_RISK_GRADE = 6.0
+AT_RISK_PROGRESS = 50
+
+PERCENTILES = [25, 50, 75, 90]
+PROGRESS_BINS = [0, 25, 50, 75, 100]
+
+
+def course_values(session, course_id, fetch_size=DEFAULT_FETCH_SIZE):
+    # Recorre la partición del curso página por página con el perfil de
+    # analítica (filas como tuplas) y devuelve un arreglo (n, 2) de
+    # [progress_percent, grade]; los nulos quedan como NaN
+    bound = get_statement(session, "select_course_performance_values").bind((course_id,))
+    bound.fetch_size = fetch_size
+    result = session.execute(bound, execution_profile=PROFILE_ANALYTICS)
+    pages = []
+    while True:
+        if result.current_rows:
+            pages.append(np.array(result.current_rows, dtype=float))
+        if not result.has_more_pages:
+            break
+        result.fetch_next_page()
+    return np.concatenate(pages) if pages else np.empty((0, 2))
+
+
+def rows_values(rows):
+    # Mismo arreglo (n, 2) que course_values, a partir de filas ya leídas de
+    # course_performance (p. ej. las cacheadas por resources.obtener_desempeno_curso)
+    values = np.array([(row.progress_percent, row.grade) for row in rows], dtype=float)
+    return values.reshape(-1, 2)
+
+
+def summarize(course_id, values):
+    # Todos los agregados en una pasada vectorizada sobre las dos columnas
+    progress, grade = values[:, 0], values[:, 1]
+    stats = {"course_id": course_id, "students": int(len(values))}
+    if not len(values):
+        return stats
+    percentiles = np.nanpercentile(grade, PERCENTILES)
+    histogram, _ = np.histogram(progress[~np.isnan(progress)], bins=PROGRESS_BINS)
+    at_risk = (grade < AT_RISK_GRADE) | (progress < AT_RISK_PROGRESS)
+    stats.update({
+        "grade_mean": float(np.nanmean(grade)),
+        "grade_percentiles": {p: float(v) for p, v in zip(PERCENTILES, percentiles)},
+        "grade_median": float(percentiles[PERCENTILES.index(50)]),
+        "progress_mean": float(np.nanmean(progress)),
+        "progress_histogram": {f"{lo}-{hi}": int(n) for lo, hi, n in zip(PROGRESS_BINS, PROGRESS_BINS[1:], histogram)},
+        "at_risk": int(np.count_nonzero(at_risk)),
+    })
+    return stats
+
+
+def course_stats(session, course_id, fetch_size=DEFAULT_FETCH_SIZE):
+    return summarize(course_id, course_values(session, course_id, fetch_size))
+
+
+def course_ids(session):
+    # Claves de partición de course_performance (SELECT DISTINCT)
+    rows = session.execute(get_statement(session, "select_course_ids"), execution_profile=PROFILE_ANALYTICS)
+    return [row[0] for row in rows]
+
+
+def all_course_stats(session, courses=None, concurrency=DEFAULT_COURSE_CONCURRENCY, fetch_size=DEFAULT_FETCH_SIZE):
+    # Estadísticas de varios cursos (por defecto todos) calculadas en paralelo;
+    # devuelve {course_id: stats}
+    courses = list(courses) if courses is not None else course_ids(session)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = pool.map(lambda course_id: course_stats(session, course_id, fetch_size), courses)
+        stats = {result["course_id"]: result for result in results}
+    log.info(f"Estadísticas calculadas para {len(stats)} cursos.")
+    return stats
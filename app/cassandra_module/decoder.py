@@ -0,0 +1,125 @@
+import csv
+import io
+import logging
+import uuid
+from datetime import datetime, timezone
+
+log = logging.getLogger(__name__)
+
+# Columnas del CSV de actividad (data/Cassandra/test.csv) con su tipo
+ACTIVITY_COLUMNS = [
+    ("user_email", "text"),
+    ("course_id", "text"),
+    ("tipo_actividad", "text"),
+    ("timestamp", "timestamp"),
+    ("activity_id", "uuid"),
+    ("detalles", "text"),
+    ("progress_percent", "int"),
+    ("grade", "float"),
+    ("device_info", "text"),
+    ("teacher_name", "text"),
+    ("teacher_email", "text"),
+    ("teacher_avg", "float"),
+]
+
+
+def parse_timestamp(value):
+    # Camino rápido para el formato fijo "YYYY-MM-DDTHH:MM:SSZ" que genera
+    # Generate_csv.py; cualquier otra variante ISO 8601 usa fromisoformat
+    if len(value) == 20 and value[10] == 'T' and value[19] == 'Z':
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]), tzinfo=timezone.utc)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+CONVERTERS = {
+    "text": None,
+    "int": int,
+    "float": float,
+    "uuid": uuid.UUID,
+    "timestamp": parse_timestamp,
+}
+
+
+def build_record_class(name, columns):
+    # Clase con __slots__ (sin __dict__ por instancia) para guardar una fila
+    fields = [column for column, _ in columns]
+    namespace = {}
+    exec(f"def __init__(self, {', '.join(fields)}):\n"
+         + "".join(f"    self.{field} = {field}\n" for field in fields), namespace)
+    return type(name, (), {
+        "__slots__": tuple(fields),
+        "__init__": namespace["__init__"],
+        "__repr__": lambda self: f"{name}({', '.join(f'{f}={getattr(self, f)!r}' for f in fields)})",
+    })
+
+
+ActivityRecord = build_record_class("ActivityRecord", ACTIVITY_COLUMNS)
+
+
+class RowDecoder:
+    # Decodificador construido una sola vez a partir de la especificación de
+    # columnas: genera con exec una función que convierte una fila completa en
+    # una sola llamada, sin desempaquetar ni convertir campo por campo en el loader.
+    # Las filas inválidas se escriben en `rejects_path` (CSV) con el motivo.
+
+    def __init__(self, columns, record_class=None, rejects_path=None):
+        self.columns = columns
+        self.record_class = record_class or build_record_class("Record", columns)
+        self.rejects_path = rejects_path
+        self.rejected = 0
+
+        namespace = {"Record": self.record_class}
+        args = []
+        for i, (column, tipo) in enumerate(columns):
+            converter = CONVERTERS[tipo]
+            if converter is None:
+                args.append(f"row[{i}]")
+            else:
+                namespace[f"conv_{i}"] = converter
+                args.append(f"conv_{i}(row[{i}])")
+        exec(f"def decode(row):\n    return Record({', '.join(args)})\n", namespace)
+        self._decode = namespace["decode"]
+        self._width = len(columns)
+
+    def decode(self, row):
+        # Devuelve el registro o None si la fila se rechazó
+        try:
+            if len(row) != self._width:
+                raise ValueError(f"se esperaban {self._width} columnas y llegaron {len(row)}")
+            return self._decode(row)
+        except Exception as e:
+            self.reject(row, e)
+            return None
+
+    def decode_chunk(self, rows):
+        records = []
+        for row in rows:
+            record = self.decode(row)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def decode_columns(self, rows):
+        # Igual que decode_chunk pero en columnas: {columna: [valores]}
+        columns = {column: [] for column, _ in self.columns}
+        appenders = [columns[column].append for column, _ in self.columns]
+        for record in self.decode_chunk(rows):
+            for append, column in zip(appenders, self.record_class.__slots__):
+                append(getattr(record, column))
+        return columns
+
+    def reject(self, row, error):
+        self.rejected += 1
+        if not self.rejects_path:
+            log.error(f"Fila inválida: {error}")
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(list(row) + [str(error)])
+        # Una sola escritura por fila para que varios procesos puedan anexar
+        with open(self.rejects_path, 'a', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+
+
+def activity_decoder(rejects_path=None):
+    return RowDecoder(ACTIVITY_COLUMNS, ActivityRecord, rejects_path)
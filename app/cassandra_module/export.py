@@ -0,0 +1,137 @@
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cassandra_module.cluster import PROFILE_ANALYTICS, get_session
+from cassandra_module.purge import read_emails
+from cassandra_module.statements import get_statement
+
+log = logging.getLogger(__name__)
+
+# Tabla -> sentencia que lee la partición completa de un estudiante
+STUDENT_TABLES = {
+    "student_activity": "select_activities",
+    "system_notifications": "select_notifications",
+    "login_logs": "select_login_logs",
+    "certificates": "select_certificates",
+    "task_reminders": "select_tasks",
+}
+
+DEFAULT_FETCH_SIZE = 1000
+DEFAULT_CONCURRENCY = 16
+# Estudiantes con archivo abierto a la vez en el modo por lotes
+DEFAULT_STUDENTS_IN_FLIGHT = 32
+
+
+class GzipJsonlFile:
+    # Archivo .jsonl.gz compartido por los hilos que exportan cada tabla;
+    # cada página se escribe completa bajo el lock
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._f = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write_page(self, extra, columns, rows):
+        lines = [json.dumps({**extra, **dict(zip(columns, row))}, default=str, ensure_ascii=False) for row in rows]
+        with self._lock:
+            self._f.write("\n".join(lines) + "\n")
+            self.rows += len(lines)
+
+    def close(self):
+        self._f.close()
+
+
+def _file_name(key):
+    return re.sub(r'[^\w@.+-]', '_', key)
+
+
+def _stream_partition(session, name, params, out, extra, fetch_size):
+    # Copia la partición al archivo página por página (memoria constante)
+    bound = get_statement(session, name).bind(params)
+    bound.fetch_size = fetch_size
+    result = session.execute(bound, execution_profile=PROFILE_ANALYTICS)
+    while True:
+        if result.current_rows:
+            out.write_page(extra, result.column_names, result.current_rows)
+        if not result.has_more_pages:
+            return
+        result.fetch_next_page()
+
+
+def export_students(session, emails, out_dir, concurrency=DEFAULT_CONCURRENCY, fetch_size=DEFAULT_FETCH_SIZE,
+                    in_flight=DEFAULT_STUDENTS_IN_FLIGHT):
+    # Un <email>.jsonl.gz por estudiante con su historial de las tablas de
+    # STUDENT_TABLES; cada línea lleva "tabla" y "user_email". Las tablas (y
+    # varios estudiantes) se leen en paralelo. Devuelve {email: filas} y
+    # los estudiantes cuya exportación falló quedan con None.
+    os.makedirs(out_dir, exist_ok=True)
+    emails = list(emails)
+    exported = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(emails), in_flight):
+            files = {email: GzipJsonlFile(os.path.join(out_dir, f"{_file_name(email)}.jsonl.gz"))
+                     for email in emails[start:start + in_flight]}
+            futures = [(email, pool.submit(_stream_partition, session, name, (email,), out,
+                                           {"tabla": tabla, "user_email": email}, fetch_size))
+                       for email, out in files.items() for tabla, name in STUDENT_TABLES.items()]
+            failed = set()
+            for email, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error(f"Error al exportar el historial de {email}: {e}")
+                    failed.add(email)
+            for email, out in files.items():
+                out.close()
+                exported[email] = None if email in failed else out.rows
+            log.info(f"Exportados {min(start + in_flight, len(emails))} de {len(emails)} estudiantes.")
+    return exported
+
+
+def export_courses(session, course_ids, out_dir, concurrency=DEFAULT_CONCURRENCY, fetch_size=DEFAULT_FETCH_SIZE):
+    # Un course_<id>.jsonl.gz por curso con su partición de course_performance
+    os.makedirs(out_dir, exist_ok=True)
+    files = {course_id: GzipJsonlFile(os.path.join(out_dir, f"course_{_file_name(course_id)}.jsonl.gz"))
+             for course_id in course_ids}
+    exported = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {course_id: pool.submit(_stream_partition, session, "select_course_performance", (course_id,), out,
+                                          {"tabla": "course_performance", "course_id": course_id}, fetch_size)
+                   for course_id, out in files.items()}
+        for course_id, future in futures.items():
+            try:
+                future.result()
+                exported[course_id] = files[course_id].rows
+            except Exception as e:
+                log.error(f"Error al exportar el curso {course_id}: {e}")
+                exported[course_id] = None
+            files[course_id].close()
+    return exported
+
+
+def main(argv):
+    # python -m cassandra_module.export student <email> <carpeta>
+    # python -m cassandra_module.export students <archivo_de_emails> <carpeta>
+    # python -m cassandra_module.export course <course_id> <carpeta>
+    if len(argv) != 3 or argv[0] not in ("student", "students", "course"):
+        print("Uso: export student <email> <carpeta> | export students <archivo> <carpeta> | export course <course_id> <carpeta>")
+        return
+    session = get_session()
+    if argv[0] == "course":
+        exported = export_courses(session, [argv[1]], argv[2])
+    else:
+        emails = [argv[1]] if argv[0] == "student" else read_emails(argv[1])
+        exported = export_students(session, emails, argv[2])
+    errores = [key for key, rows in exported.items() if rows is None]
+    print(f"✓ {len(exported) - len(errores)} exportados en {argv[2]}, {len(errores)} con error")
+    session.cluster.shutdown()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
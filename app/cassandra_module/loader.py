@@ -1,26 +1,34 @@
 import logging
 import uuid
-import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import zlib
 import random
 from datetime import datetime
-from cassandra.cluster import Cluster
-from cassandra.query import SimpleStatement
-from cassandra.policies import RoundRobinPolicy
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+from cassandra_module.cluster import KEYSPACE, PROFILE_BULK_WRITE, new_session
+from cassandra_module.scanner import count_tables
+from cassandra_module.statements import LOADER_STATEMENTS, SCAN_TABLES, get_statement, partition_key, prepare_statements, row_delete, table_name
+from cassandra_module.buckets import month_bucket
+from cassandra_module.cache import invalidate_all
+from cassandra_module.checkpoint import CheckpointJournal
+from cassandra_module.decoder import ActivityRecord, activity_decoder, parse_timestamp
+from cassandra_module.view_counts import ViewCounter
+from cassandra_module.sharding import header_length, merge_stats, read_chunks, split_shards
+from cassandra_module.writer import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, OVERLOAD_ERRORS, AsyncWriter, DeadLetterFile, PartitionBatcher, print_report
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
-KEYSPACE = "plataforma_online"
-
-CREATE_KEYSPACE = f"""
-CREATE KEYSPACE IF NOT EXISTS {KEYSPACE}
-WITH replication = {{ 'class': 'SimpleStrategy', 'replication_factor': 1 }};
-"""
+# Filas por bloque entre un checkpoint y el siguiente
+DEFAULT_CHECKPOINT_EVERY = 5000
 
 TABLES = [
     # (misma definición de tablas que ya tenías)
-    """
-    CREATE TABLE IF NOT EXISTS student_activity (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.student_activity (
         activity_id uuid,
         user_email text,
         course_id text,
@@ -30,8 +38,8 @@ TABLES = [
         PRIMARY KEY ((user_email), timestamp, activity_id)
     ) WITH CLUSTERING ORDER BY (timestamp DESC, activity_id DESC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS course_progress (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.course_progress (
         user_email text,
         course_id text,
         progress_percent int,
@@ -39,8 +47,8 @@ TABLES = [
         PRIMARY KEY ((user_email), course_id)
     ) WITH CLUSTERING ORDER BY (course_id ASC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS system_notifications (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.system_notifications (
         user_email text,
         notification_id uuid,
         course_id text,
@@ -50,8 +58,8 @@ TABLES = [
         PRIMARY KEY ((user_email), timestamp, notification_id)
     ) WITH CLUSTERING ORDER BY (timestamp DESC, notification_id DESC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS user_sessions (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.user_sessions (
         user_email text,
         session_id uuid,
         device_info text,
@@ -59,8 +67,8 @@ TABLES = [
         PRIMARY KEY ((user_email), session_id)
     ) WITH CLUSTERING ORDER BY (session_id DESC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS certificates (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.certificates (
         certificate_id uuid,
         user_email text,
         course_id text,
@@ -71,8 +79,8 @@ TABLES = [
         PRIMARY KEY ((user_email), completion_date, certificate_id)
     ) WITH CLUSTERING ORDER BY (completion_date DESC, certificate_id DESC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS course_performance (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.course_performance (
         course_id text,
         user_email text,
         progress_percent int,
@@ -80,8 +88,8 @@ TABLES = [
         PRIMARY KEY ((course_id), user_email)
     ) WITH CLUSTERING ORDER BY (user_email ASC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS login_logs (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.login_logs (
         user_email text,
         session_id uuid,
         start_time timestamp,
@@ -91,8 +99,8 @@ TABLES = [
         PRIMARY KEY ((user_email), last_activity, session_id)
     ) WITH CLUSTERING ORDER BY (last_activity DESC, session_id DESC);
     """,
-    """
-    CREATE TABLE IF NOT EXISTS task_reminders (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.task_reminders (
         user_email text,
         task_id uuid,
         task_description text,
@@ -101,16 +109,16 @@ TABLES = [
         PRIMARY KEY ((user_email), task_id)
     );
     """,
-    """
-    CREATE TABLE IF NOT EXISTS course_views (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.course_views (
         course_id text,
         view_date timestamp,
         views int,
         PRIMARY KEY ((course_id), view_date)
     );
     """,
-    """
-    CREATE TABLE IF NOT EXISTS top_instructors (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.top_instructors (
         ranking int,
         instructor_email text,
         instructor_name text,
@@ -118,218 +126,642 @@ TABLES = [
         total_courses int,
         PRIMARY KEY (ranking)
     );
+    """,
+    # Vistas por curso en buckets de día (partición) y hora (clustering)
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.course_view_counts (
+        course_id text,
+        day date,
+        hour int,
+        views counter,
+        PRIMARY KEY ((course_id, day), hour)
+    ) WITH CLUSTERING ORDER BY (hour ASC);
+    """,
+    # Ranking de instructores: una sola partición ordenada por calificación,
+    # así el top-N es un slice de la partición sin ordenar en el cliente
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.instructor_leaderboard (
+        board text,
+        avg_rating float,
+        instructor_email text,
+        instructor_name text,
+        total_courses int,
+        PRIMARY KEY ((board), avg_rating, instructor_email)
+    ) WITH CLUSTERING ORDER BY (avg_rating DESC, instructor_email ASC);
+    """,
+    # Hash de cada fila fuente ya cargada (modo incremental). De la fila sólo
+    # se guarda lo que hace falta para rehacer las claves de sus filas
+    # derivadas y borrarlas (curso y fecha, ver row_version), sin notas,
+    # detalles ni datos del profesor. previous_data guarda la versión anterior
+    # de una fila modificada hasta que clean_incremental termina de borrar lo
+    # que ya no corresponde. El bucket sale del email: las filas de un usuario
+    # en cada archivo fuente se borran juntas al purgarlo.
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.load_row_hashes (
+        source text,
+        bucket int,
+        user_email text,
+        row_key text,
+        row_hash text,
+        row_data text,
+        previous_data text,
+        PRIMARY KEY ((source, bucket), user_email, row_key)
+    );
+    """,
+    # Copias de student_activity y login_logs con una partición por
+    # (usuario, mes) para que el historial de un estudiante no crezca sin límite
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.student_activity_by_month (
+        user_email text,
+        month text,
+        timestamp timestamp,
+        activity_id uuid,
+        course_id text,
+        tipo_actividad text,
+        detalles text,
+        PRIMARY KEY ((user_email, month), timestamp, activity_id)
+    ) WITH CLUSTERING ORDER BY (timestamp DESC, activity_id DESC);
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.login_logs_by_month (
+        user_email text,
+        month text,
+        last_activity timestamp,
+        session_id uuid,
+        start_time timestamp,
+        device_info text,
+        active_status boolean,
+        PRIMARY KEY ((user_email, month), last_activity, session_id)
+    ) WITH CLUSTERING ORDER BY (last_activity DESC, session_id DESC);
+    """,
+    # Meses con datos de cada usuario en las tablas por mes, para leer o
+    # borrar su historial completo sin recorrer todos los meses posibles
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.user_buckets (
+        user_email text,
+        tabla text,
+        month text,
+        PRIMARY KEY ((user_email), tabla, month)
+    ) WITH CLUSTERING ORDER BY (tabla ASC, month DESC);
+    """,
+    # Cursos de cada usuario, para encontrar sus filas en course_performance
+    # (particionada por curso) sin recorrer todos los cursos
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.user_courses (
+        user_email text,
+        course_id text,
+        PRIMARY KEY ((user_email), course_id)
+    );
+    """,
+    # Archivos fuente con hashes de cada usuario en load_row_hashes, para
+    # borrarlos al purgarlo (modo incremental)
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEYSPACE}.user_sources (
+        user_email text,
+        source text,
+        PRIMARY KEY ((user_email), source)
+    );
     """
 ]
 
+# Partición única del leaderboard de instructores
+LEADERBOARD = "global"
+
+# Particiones en que se reparten los hashes de un mismo archivo fuente
+ROW_HASH_BUCKETS = 16
+
+# Tablas cuya fila puede venir de varias filas del CSV (mismo usuario y
+# curso, o mismo mes): en modo incremental sólo se borra una si ya ninguna
+# fila vigente la escribe (ver clean_incremental)
+SHARED_TABLES = {"course_progress", "course_performance", "user_courses", "user_buckets"}
+
 def connect_to_cassandra():
-    cluster = Cluster(
-        contact_points=["127.0.0.1"],
-        load_balancing_policy=RoundRobinPolicy(),
-        protocol_version=5
-    )
-    session = cluster.connect()
-    session.execute(CREATE_KEYSPACE)
-    session.set_keyspace(KEYSPACE)
-    return session
+    # Sesión propia del loader con los perfiles de cluster.py (sin USE <keyspace>)
+    return new_session()
 
 def create_schema(session):
     for statement in TABLES:
         session.execute(SimpleStatement(statement))
     log.info("Esquema de Cassandra creado correctamente.")
 
-def load_cassandra_data(csv_path):
+# Mensaje de error de cada inserción, como se reportaban fila por fila; los
+# borrados del modo incremental usan uno genérico con el nombre de la sentencia
+INSERT_ERRORS = {
+    "insert_student_activity": "Error al insertar datos de actividad del estudiante",
+    "insert_course_progress": "Error al insertar datos de progreso del curso",
+    "insert_system_notifications": "Error al insertar datos de notificaciones",
+    "insert_user_sessions": "Error al insertar datos de sesiones de usuario",
+    "insert_certificates": "Error al insertar datos de certificados",
+    "insert_course_performance": "Error al insertar datos de desempeño en curso",
+    "insert_login_logs": "Error al insertar datos de login logs",
+    "insert_task_reminders": "Error al insertar datos de recordatorios de tareas",
+    "insert_top_instructors": "Error al insertar datos del instructor",
+    "insert_load_row_hashes": "Error al guardar el hash de la fila",
+    "update_course_view_counts": "Error al actualizar el contador de vistas del curso",
+    "insert_student_activity_by_month": "Error al insertar datos de actividad por mes",
+    "insert_login_logs_by_month": "Error al insertar datos de login logs por mes",
+    "insert_user_buckets": "Error al registrar el mes del usuario",
+    "insert_user_courses": "Error al registrar el curso del usuario",
+    "insert_user_sources": "Error al registrar el archivo fuente del usuario",
+}
+
+# Tablas que se vacían antes de una carga completa
+LOADED_TABLES = [
+    "student_activity", "course_progress", "system_notifications", "user_sessions", "certificates",
+    "course_performance", "login_logs", "task_reminders", "course_views", "course_view_counts",
+    "top_instructors", "load_row_hashes", "student_activity_by_month", "login_logs_by_month", "user_buckets",
+    "user_courses", "user_sources",
+]
+
+def truncate_tables(session):
+    for table in LOADED_TABLES:
+        session.execute(f"TRUNCATE {KEYSPACE}.{table};")
+
+def row_key(row):
+    # Clave de la fila fuente: (user_email, activity_id). Si una fila cambia
+    # de email se trata como una fila nueva y la anterior como eliminada
+    return row[0], row[4]
+
+def row_hash(row):
+    return hashlib.sha1("\x1f".join(row).encode('utf-8')).hexdigest()
+
+def row_hash_bucket(user_email):
+    return zlib.crc32(user_email.encode('utf-8')) % ROW_HASH_BUCKETS
+
+def row_version(row):
+    # Lo que se guarda de una fila: con el email y el activity_id de su clave
+    # alcanza para rehacer las claves de todas sus filas derivadas
+    return [row[1], row[3]]
+
+def load_row_hashes(session, source):
+    # Lee lo ya guardado de un archivo fuente:
+    # {(user_email, row_key): (row_hash, versión, versión anterior o None)}
+    statement = get_statement(session, "select_load_row_hashes")
+    futures = [session.execute_async(statement, (source, bucket), execution_profile=PROFILE_BULK_WRITE)
+               for bucket in range(ROW_HASH_BUCKETS)]
+    hashes = {}
+    for future in futures:
+        for row in future.result():
+            hashes[(row.user_email, row.row_key)] = (row.row_hash, json.loads(row.row_data) if row.row_data else None,
+                                                     json.loads(row.previous_data) if row.previous_data else None)
+    return hashes
+
+def row_hash_write(source, key, digest, version, previous=None):
+    user_email, activity = key
+    return ("insert_load_row_hashes", (user_email, source, row_hash_bucket(user_email), activity, digest,
+                                       json.dumps(version), json.dumps(previous) if previous else None))
+
+def source_keys(csv_path):
+    # Claves de todas las filas del archivo, para detectar las que desaparecieron
+    keys = set()
+    for _, rows in read_chunks(csv_path, header_length(csv_path), os.path.getsize(csv_path), DEFAULT_CHECKPOINT_EVERY):
+        keys.update(row_key(row) for row in rows if len(row) > 4)
+    return keys
+
+def index_writes(estado, name, params):
+    # Escribe una fila de índice (user_buckets, user_courses) sólo la primera
+    # vez que aparece en este proceso
+    vistos = estado.setdefault("indices", set())
+    if (name, params) in vistos:
+        return []
+    vistos.add((name, params))
+    return [(name, params)]
+
+def build_row_writes(record, estado):
+    # Convierte un ActivityRecord ya decodificado en la lista de (sentencia, parámetros) a escribir.
+    # Con estado["deterministic"] los IDs, fechas y valores aleatorios se
+    # derivan del contenido de la fila, así recargarla escribe las mismas claves.
+    user_email = record.user_email
+    course_id = record.course_id
+    timestamp = record.timestamp
+    activity_id = record.activity_id
+    progress_percent = record.progress_percent
+    grade = record.grade
+    device_info = record.device_info
+
+    deterministic = estado.get("deterministic", False)
+    if deterministic:
+        rng = random.Random(activity_id.int)
+        now = timestamp.replace(tzinfo=None)
+        new_id = lambda tipo: uuid.uuid5(activity_id, tipo)
+    else:
+        rng = random
+        now = datetime.now()
+        new_id = lambda tipo: uuid.uuid4()
+
+    month = month_bucket(timestamp)
+    writes = [
+        ("insert_student_activity", (user_email, course_id, record.tipo_actividad, timestamp, activity_id, record.detalles)),
+        ("insert_student_activity_by_month", (user_email, month, timestamp, activity_id, course_id, record.tipo_actividad, record.detalles)),
+        ("insert_course_progress", (user_email, course_id, progress_percent, grade)),
+    ]
+    writes.extend(index_writes(estado, "insert_user_buckets", (user_email, "student_activity_by_month", month)))
+
+    notification_id = new_id("notification")
+    tipo_notificacion = rng.choice(['Anuncio', 'Recordatorio', 'Calificación'])
+    mensaje = f"{tipo_notificacion} para {user_email}"
+    writes.append(("insert_system_notifications", (user_email, timestamp, notification_id, course_id, tipo_notificacion, mensaje)))
+
+    session_id = new_id("session")
+    last_activity = now
+    writes.append(("insert_user_sessions", (user_email, session_id, device_info, last_activity)))
+
+    student_name = user_email.split('@')[0]  # Obtener el nombre del estudiante a partir del email
+    certificate_id = new_id("certificate")
+    completion_date = now.date()
+    certificate_url = f"https://certificados.com/{student_name}_curso"
+    writes.append(("insert_certificates", (user_email, completion_date, certificate_id, course_id, student_name, course_id, certificate_url)))
+
+    writes.append(("insert_course_performance", (user_email, course_id, progress_percent, grade)))
+    writes.extend(index_writes(estado, "insert_user_courses", (user_email, course_id)))
+
+    # Insertar login logs
+    start_time = now
+    last_activity = now
+    device_info = rng.choice(['Windows 10 - Chrome', 'MacBook - Safari', 'Android - Firefox'])
+    active_status = rng.choice([True, False])
+    writes.append(("insert_login_logs", (user_email, last_activity, session_id, start_time, device_info, active_status)))
+    month = month_bucket(last_activity)
+    writes.append(("insert_login_logs_by_month", (user_email, month, last_activity, session_id, start_time, device_info, active_status)))
+    writes.extend(index_writes(estado, "insert_user_buckets", (user_email, "login_logs_by_month", month)))
+
+    # Insertar recordatorios de tareas
+    task_id = new_id("task")
+    task_description = "Completar módulo 3"
+    due_date = now.date()
+    is_completed = rng.choice([True, False])
+    writes.append(("insert_task_reminders", (user_email, task_id, task_description, due_date, is_completed)))
+
+    return writes
+
+def version_writes(key, version):
+    # Escrituras que hizo una versión guardada de la fila (con IDs
+    # deterministas). Las columnas que no forman parte de ninguna clave no se
+    # guardan y quedan en None: sólo se usan las claves de estas escrituras
+    if not version:
+        return None, []
+    course_id, timestamp = version
+    record = ActivityRecord(key[0], course_id, None, parse_timestamp(timestamp), uuid.UUID(key[1]),
+                            None, None, None, None, None, None, None)
+    return record, build_row_writes(record, {"deterministic": True})
+
+def stale_rows(old_writes, new_writes=()):
+    # Borrados de las filas de la versión anterior que la nueva no reescribe
+    # (las de igual clave primaria se sobrescriben); las tablas compartidas
+    # quedan para clean_incremental
+    keep = {row_delete(name, params) for name, params in new_writes}
+    deletes = []
+    for name, params in old_writes:
+        delete = row_delete(name, params)
+        if delete and table_name(name) not in SHARED_TABLES and delete not in keep:
+            deletes.append(delete)
+    return deletes
+
+def shared_rows(writes):
+    return {row_delete(name, params) for name, params in writes if table_name(name) in SHARED_TABLES}
+
+def clean_incremental(session, csv_path, source, concurrency=DEFAULT_CONCURRENCY, dead_letter=None):
+    # Última etapa del modo incremental, con todos los shards ya escritos,
+    # para que el resultado coincida con el de una carga completa:
+    # - filas que ya no están en el CSV: se borran sus filas derivadas y su hash
+    # - filas modificadas (con previous_data): se repiten los borrados de la
+    #   versión anterior, por si alguno no llegó antes de un corte
+    # - en ambos casos, las filas de las tablas compartidas que ya no escribe
+    #   ninguna fila vigente de esos usuarios
+    # Si algo falla se conservan los hashes y previous_data para reintentar.
+    stored = load_row_hashes(session, source)
+    seen = source_keys(csv_path)
+    writer = AsyncWriter(session, concurrency, dead_letter=dead_letter)
+    views = ViewCounter()
+
+    def submit(name, params):
+        writer.submit(table_name(name), get_statement(session, name), params, items=[(name, params)])
+
+    dropped, revised, candidates, users = [], [], set(), set()
+    for key, (_, row, previous) in stored.items():
+        if key not in seen:
+            dropped.append(key)
+            versions, current = [row, previous], []
+        elif previous:
+            revised.append(key)
+            versions, current = [previous], version_writes(key, row)[1]
+        else:
+            continue
+        users.add(key[0])
+        for version in versions:
+            record, old_writes = version_writes(key, version)
+            if record is None:
+                continue
+            for name, params in stale_rows(old_writes, current):
+                submit(name, params)
+            candidates |= shared_rows(old_writes)
+            if version is row:
+                views.add(record.course_id, record.timestamp, -1)
+
+    live = set()
+    for key, (_, row, _) in stored.items():
+        if key in seen and key[0] in users:
+            live |= shared_rows(version_writes(key, row)[1])
+    for name, params in candidates - live:
+        submit(name, params)
+    all_stats = [writer.drain()]
+    if any(counts["error"] for counts in all_stats[0].values()):
+        log.warning("Hubo errores al borrar versiones anteriores; se conservan sus hashes para reintentar.")
+        return all_stats[0]
+
+    for user_email, activity in dropped:
+        submit("delete_row_load_row_hashes", (user_email, source, row_hash_bucket(user_email), activity))
+    for key in revised:
+        digest, row, _ = stored[key]
+        submit(*row_hash_write(source, key, digest, row))
+    all_stats.append(writer.drain())
+    # Las vistas de las filas eliminadas se descuentan una sola vez, ya
+    # borrados sus hashes: un corte aquí pierde el descuento pero no lo repite
+    for params in views.drain():
+        submit("update_course_view_counts", params)
+    all_stats.append(writer.drain())
+    log.info(f"Modo incremental: {len(dropped)} filas eliminadas del CSV y {len(revised)} versiones anteriores depuradas.")
+    return merge_stats(all_stats)
+
+def aggregate_instructor(instructores, record):
+    # Acumula la calificación y los cursos de cada instructor; el ranking se
+    # escribe una sola vez al final de la carga (ver write_leaderboard)
+    agg = instructores.get(record.teacher_email)
+    if agg is None:
+        agg = instructores[record.teacher_email] = {"name": record.teacher_name, "rating_sum": 0.0, "ratings": 0, "courses": set()}
+    agg["rating_sum"] += record.teacher_avg
+    agg["ratings"] += 1
+    agg["courses"].add(record.course_id)
+
+def merge_instructors(parts):
+    merged = {}
+    for part in parts:
+        for email, agg in part.items():
+            total = merged.setdefault(email, {"name": agg["name"], "rating_sum": 0.0, "ratings": 0, "courses": set()})
+            total["rating_sum"] += agg["rating_sum"]
+            total["ratings"] += agg["ratings"]
+            total["courses"].update(agg["courses"])
+    return merged
+
+def instructors_to_json(instructores):
+    return {email: dict(agg, courses=sorted(agg["courses"])) for email, agg in instructores.items()}
+
+def instructors_from_json(data):
+    return {email: dict(agg, courses=set(agg["courses"])) for email, agg in (data or {}).items()}
+
+def write_leaderboard(session, instructores, batch_size=DEFAULT_BATCH_SIZE):
+    # Reescribe la partición del leaderboard (ordenada por avg_rating en el
+    # servidor) y top_instructors con el ranking real de cada instructor
+    ranking = sorted(
+        ((agg["rating_sum"] / agg["ratings"], email, agg["name"], len(agg["courses"])) for email, agg in instructores.items()),
+        key=lambda item: (-item[0], item[1]),
+    )
+    session.execute(get_statement(session, "delete_instructor_leaderboard"), (LEADERBOARD,), execution_profile=PROFILE_BULK_WRITE)
+    session.execute(f"TRUNCATE {KEYSPACE}.top_instructors;")
+    insert_board = get_statement(session, "insert_instructor_leaderboard")
+    insert_top = get_statement(session, "insert_top_instructors")
+    for i in range(0, len(ranking), batch_size):
+        batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for avg_rating, email, name, total_courses in ranking[i:i + batch_size]:
+            batch.add(insert_board, (LEADERBOARD, avg_rating, email, name, total_courses))
+        session.execute(batch, execution_profile=PROFILE_BULK_WRITE)
+    for position, (avg_rating, email, name, total_courses) in enumerate(ranking, start=1):
+        session.execute(insert_top, (position, email, name, avg_rating, total_courses), execution_profile=PROFILE_BULK_WRITE)
+    log.info(f"Leaderboard actualizado con {len(ranking)} instructores.")
+
+def write_sync(session, name, params, stats, dead_letter=None):
+    # Escritura bloqueante del modo "sync"; los errores se cuentan y van al dead-letter
+    counts = stats.setdefault(table_name(name), {"ok": 0, "error": 0})
+    statement = get_statement(session, name)
+    try:
+        session.execute(statement, params, execution_profile=PROFILE_BULK_WRITE)
+        counts["ok"] += 1
+    except Exception as e:
+        counts["error"] += 1
+        print(f"{INSERT_ERRORS.get(name, f'Error al escribir {name}')}: {e}")
+        if dead_letter:
+            dead_letter.write(name, params, e, maybe_applied=isinstance(e, OVERLOAD_ERRORS) and not statement.is_idempotent)
+
+def flush_view_counts(session, estado, mode="sync"):
+    # Envía los deltas de vistas acumulados en el bloque. Un contador no se
+    # puede reescribir sin sumar de nuevo, así que se envían una sola vez y
+    # después del checkpoint del bloque: al reanudar, el bloque que se repite
+    # todavía no había enviado los suyos. Un corte entre el checkpoint y la
+    # confirmación puede perder los deltas de ese bloque, pero no duplicarlos.
+    name = "update_course_view_counts"
+    deltas = estado["views"].drain()
+    writer = estado.get("writer") if mode in ("async", "batch") else None
+    stats = {}
+    for params in deltas:
+        if writer:
+            writer.submit(table_name(name), get_statement(session, name), params, items=[(name, params)])
+        else:
+            write_sync(session, name, params, stats, estado.get("dead_letter"))
+    return writer.drain() if writer else stats
+
+def ingest_rows(session, rows, mode="sync", concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE, estado=None):
+    # Escribe las filas del CSV y devuelve {tabla: {"ok": n, "error": n}}.
+    # Al volver, todas las escrituras ya fueron confirmadas (o fallaron).
+    # Si estado["hashes"] existe (modo incremental) sólo se escriben las filas
+    # nuevas o cuyo contenido cambió, y se guarda su hash. De una fila
+    # modificada se borran antes las filas de su versión anterior que la
+    # nueva no reescribe.
+    estado = estado if estado is not None else {"instructores": {}}
+    decoder = estado.setdefault("decoder", activity_decoder())
+    hashes = estado.get("hashes")
+    dead_letter = estado.get("dead_letter")
+    # El writer se conserva entre bloques para no perder la ventana AIMD ya ajustada
+    writer = None
+    if mode in ("async", "batch"):
+        writer = estado.get("writer") or estado.setdefault("writer", AsyncWriter(session, concurrency, dead_letter=dead_letter))
+    batcher = PartitionBatcher(writer, batch_size) if mode == "batch" else None
+    stats = {}
+
+    views = estado.setdefault("views", ViewCounter())
+
+    def dispatch(name, params):
+        if batcher:
+            batcher.add(table_name(name), partition_key(name, params), name, get_statement(session, name), params)
+            return
+        if writer:
+            writer.submit(table_name(name), get_statement(session, name), params, items=[(name, params)])
+            return
+        write_sync(session, name, params, stats, dead_letter)
+
+    for row in rows:
+        record = decoder.decode(row)
+        if record is None:
+            continue
+        # El agregado de instructores incluye también las filas sin cambios
+        aggregate_instructor(estado["instructores"], record)
+        if hashes is not None:
+            key, digest = row_key(row), row_hash(row)
+            previous = hashes.get(key)
+            if previous is not None and previous[0] == digest:
+                estado["sin_cambios"] += 1
+                continue
+        writes = build_row_writes(record, estado)
+        old_record = None
+        if hashes is not None:
+            pending = None
+            if previous is not None:
+                old_record, old_writes = version_writes(key, previous[1])
+                for name, params in stale_rows(old_writes, writes):
+                    dispatch(name, params)
+                # Se conserva la versión más antigua aún no depurada por clean_incremental
+                pending = previous[2] or previous[1]
+            version = row_version(row)
+            hashes[key] = (digest, version, pending)
+            writes.extend(index_writes(estado, "insert_user_sources", (record.user_email, estado["source"])))
+            writes.append(row_hash_write(estado["source"], key, digest, version, pending))
+
+        # Cada actividad cuenta como una vista del curso. Una fila modificada
+        # en modo incremental ya se contó en la carga anterior: sólo se mueve
+        # su vista si cambió de curso u hora. Los deltas se envían después del
+        # checkpoint del bloque (ver flush_view_counts)
+        if old_record is not None:
+            views.add(old_record.course_id, old_record.timestamp, -1)
+        if hashes is None or previous is None or old_record is not None:
+            views.add(record.course_id, record.timestamp)
+
+        for name, params in writes:
+            dispatch(name, params)
+
+    if batcher:
+        batcher.flush()
+    if writer:
+        stats = writer.drain()
+    return stats
+
+def ingest_shard(session, csv_path, shard, offset=None, instructores=None, journal=None, mode="sync",
+                 concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE, checkpoint_every=DEFAULT_CHECKPOINT_EVERY,
+                 incremental=False, rejects_path=None, dead_letter_path=None):
+    # Carga el rango [offset, fin) de un shard por bloques; al terminar cada
+    # bloque (todas sus escrituras confirmadas) registra en la bitácora el
+    # offset y el agregado de instructores acumulado hasta ahí.
+    # Devuelve (stats, instructores).
+    start, end = shard
+    offset = start if offset is None else offset
+    # Con bitácora los IDs y fechas salen del contenido de la fila: al reanudar,
+    # el bloque posterior al último checkpoint se reescribe con las mismas
+    # claves en lugar de duplicar notificaciones, sesiones, certificados, etc.
+    estado = {"instructores": instructores or {}, "decoder": activity_decoder(rejects_path),
+              "deterministic": journal is not None}
+    if dead_letter_path:
+        estado["dead_letter"] = DeadLetterFile(dead_letter_path)
+    if incremental:
+        source = os.path.basename(csv_path)
+        estado.update(deterministic=True, source=source, sin_cambios=0, hashes=load_row_hashes(session, source))
+    all_stats = []
+    for chunk_end, rows in read_chunks(csv_path, offset, end, checkpoint_every):
+        all_stats.append(ingest_rows(session, rows, mode, concurrency, batch_size, estado))
+        if journal:
+            journal.record(shard, chunk_end, instructors_to_json(estado["instructores"]))
+        all_stats.append(flush_view_counts(session, estado, mode))
+    if incremental:
+        log.info(f"Shard {shard}: {estado['sin_cambios']} filas sin cambios omitidas.")
+    if estado["decoder"].rejected:
+        log.warning(f"Shard {shard}: {estado['decoder'].rejected} filas rechazadas en {rejects_path}.")
+    if dead_letter_path and estado["dead_letter"].count:
+        log.warning(f"Shard {shard}: {estado['dead_letter'].count} escrituras fallidas en {dead_letter_path}.")
+    return merge_stats(all_stats), estado["instructores"]
+
+def _load_shard(args):
+    # Se ejecuta en un proceso aparte: cada worker abre su propio Cluster/sesión
+    csv_path, shard, offset, instructores, journal_path, options = args
+    session = connect_to_cassandra()
+    prepare_statements(session, LOADER_STATEMENTS)
+    try:
+        return ingest_shard(session, csv_path, shard, offset, instructores, CheckpointJournal(journal_path), **options)
+    finally:
+        session.cluster.shutdown()
+
+def validate_load(session, stats, full):
+    print("Filas en Cassandra por tabla:")
+    counts = count_tables(session, [tabla for tabla in LOADED_TABLES if tabla in SCAN_TABLES])
+    for tabla, total in counts.items():
+        print(f"  {tabla}: {total}")
+    # Cada fila del CSV es una actividad distinta: tras una carga completa
+    # deben coincidir las escrituras confirmadas y las filas de la tabla
+    escritas = stats.get("student_activity", {}).get("ok")
+    if full and escritas is not None and escritas != counts["student_activity"]:
+        log.warning(f"student_activity tiene {counts['student_activity']} filas pero se escribieron {escritas}.")
+    return counts
+
+def load_cassandra_data(csv_path, mode="sync", concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE, workers=1,
+                        resume=False, checkpoint_path=None, checkpoint_every=DEFAULT_CHECKPOINT_EVERY, incremental=False,
+                        rejects_path=None, dead_letter_path=None, validate=False):
+    # mode="sync": una escritura bloqueante a la vez (comportamiento original)
+    # mode="async": pipeline con execute_async y hasta `concurrency` en vuelo
+    # mode="batch": como "async", pero agrupando por partición en batches
+    #               UNLOGGED de como máximo `batch_size` sentencias
+    # workers > 1 reparte el archivo en shards por rango de bytes y procesa
+    # cada uno en un proceso distinto con el modo indicado
+    # resume=True continúa desde la bitácora de checkpoints (por defecto
+    # `<csv>.checkpoint`) sin hacer TRUNCATE; sin bitácora hace una carga completa.
+    # Toda carga con bitácora usa IDs deterministas, así repetir el último
+    # bloque sin checkpoint no duplica filas
+    # incremental=True no hace TRUNCATE: usa IDs deterministas y sólo escribe
+    # las filas nuevas o modificadas según el hash guardado en load_row_hashes;
+    # al final borra lo que dejaron las versiones anteriores y las filas que
+    # ya no están en el CSV
+    # Las filas que no se pueden decodificar van a `rejects_path` (por defecto `<csv>.rejects.csv`)
+    # y las escrituras que fallan a `dead_letter_path` (por defecto `<csv>.deadletter.jsonl`),
+    # que se puede reprocesar con writer.replay_dead_letters()
+    # validate=True cuenta al final las filas de cada tabla con el scanner por rangos de tokens
     session = connect_to_cassandra()
     create_schema(session)
+    # Cada sentencia se prepara una sola vez por sesión, no por fila
+    prepare_statements(session, LOADER_STATEMENTS)
 
-    session.execute("""
-        TRUNCATE student_activity;
-    """)
-    session.execute("""
-        TRUNCATE course_progress;
-    """)
-    session.execute("""
-        TRUNCATE system_notifications;
-    """)
-    session.execute("""
-        TRUNCATE user_sessions;
-    """)
-    session.execute("""
-        TRUNCATE certificates;
-    """)
-    session.execute("""
-        TRUNCATE course_performance;
-    """)
-    session.execute("""
-        TRUNCATE login_logs;
-    """)
-    session.execute("""
-        TRUNCATE task_reminders;
-    """)
-    session.execute("""
-        TRUNCATE course_views;
-    """)
-    session.execute("""
-        TRUNCATE top_instructors;
-    """)
+    journal = CheckpointJournal(checkpoint_path or f"{csv_path}.checkpoint")
+    saved = journal.load(csv_path) if resume and journal.exists() else None
+    if saved:
+        shards, offsets, states = saved
+        log.info(f"Reanudando carga desde la bitácora {journal.path}...")
+    else:
+        shards = split_shards(csv_path, workers)
+        offsets, states = {}, {}
+        if not incremental:
+            truncate_tables(session)
+        journal.start(csv_path, shards)
 
     log.info("Insertando datos desde CSV...")
-    instructores_vistos = set()
-    ranking = 1
-
-    with open(csv_path, 'r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        next(reader)  # Saltar encabezado
-
-        for row in reader:
-            try:
-                user_email, course_id, tipo_actividad, timestamp_str, activity_id, detalles, progress_percent, grade, device_info, teacher_name, teacher_email,teacher_avg = row
-                    
-                # Convertir el timestamp a formato datetime de Python
-                timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))  # Asumimos que el formato es ISO 8601
-                progress_percent = int(progress_percent)
-                grade = float(grade)
-                activity_id = uuid.UUID(activity_id)  # Convertir a UUID
-                
-                INSERT_student_activity = """
-                    INSERT INTO student_activity (user_email, course_id, tipo_actividad, timestamp, activity_id, detalles)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_student_activity)
-                try:
-                    session.execute(prepared, (user_email, course_id, tipo_actividad, timestamp, activity_id, detalles))
-                except Exception as e:
-                    print(f"Error al insertar datos de actividad del estudiante: {e}")
-
-                INSERT_course_progress = """
-                    INSERT INTO course_progress (user_email, course_id, progress_percent, grade)
-                    VALUES (?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_course_progress)
-                try:
-                    session.execute(prepared, (user_email, course_id, progress_percent, grade))
-                except Exception as e:
-                    print(f"Error al insertar datos de progreso del curso: {e}")
-
-                notification_id = uuid.uuid4()
-                tipo_notificacion = random.choice(['Anuncio', 'Recordatorio', 'Calificación'])
-                mensaje = f"{tipo_notificacion} para {user_email}"
-
-                INSERT_system_notifications = """
-                    INSERT INTO system_notifications (user_email, timestamp, notification_id, course_id, tipo, notificacion)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_system_notifications)
-                try:
-                    session.execute(prepared, (user_email, timestamp, notification_id, course_id, tipo_notificacion, mensaje))
-                except Exception as e:
-                    print(f"Error al insertar datos de notificaciones: {e}")
-
-                session_id = uuid.uuid4()
-                last_activity = datetime.now()
-
-                INSERT_user_sessions = """
-                    INSERT INTO user_sessions (user_email, session_id, device_info, last_activity)
-                    VALUES (?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_user_sessions)
-                try:
-                    session.execute(prepared, (user_email, session_id, device_info, last_activity))
-                except Exception as e:
-                    print(f"Error al insertar datos de sesiones de usuario: {e}")
-
-                student_name = user_email.split('@')[0]  # Obtener el nombre del estudiante a partir del email
-                certificate_id = uuid.uuid4()
-                completion_date = datetime.now().date()
-                certificate_url = f"https://certificados.com/{student_name}_curso"
-
-                INSERT_certificates = """
-                    INSERT INTO certificates (user_email, completion_date, certificate_id, course_id, student_name, course_title, certificate_url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_certificates)
-                try:
-                    session.execute(prepared, (user_email, completion_date, certificate_id, course_id, student_name, course_id, certificate_url))
-                except Exception as e:
-                    print(f"Error al insertar datos de certificados: {e}")
-
-
-                INSERT_course_performance = """
-                    INSERT INTO course_performance (user_email, course_id, progress_percent, grade)
-                    VALUES (?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_course_performance)
-                try:
-                    session.execute(prepared, (user_email, course_id, progress_percent, grade))
-                except Exception as e:
-                    print(f"Error al insertar datos de desempeño en curso: {e}")
-
-                            # Insertar login logs
-                start_time = datetime.now()
-                last_activity = datetime.now()
-                device_info = random.choice(['Windows 10 - Chrome', 'MacBook - Safari', 'Android - Firefox'])
-                active_status = random.choice([True, False])
-
-                INSERT_login_logs = """
-                    INSERT INTO login_logs (user_email, last_activity, session_id, start_time, device_info, active_status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_login_logs)
-                try:
-                    session.execute(prepared, (user_email, last_activity, session_id, start_time, device_info, active_status))
-                except Exception as e:
-                    print(f"Error al insertar datos de login logs: {e}")
-
-                # Insertar recordatorios de tareas
-                task_id = uuid.uuid4()
-                task_description = "Completar módulo 3"
-                due_date = datetime.now().date()
-                is_completed = random.choice([True, False])
-
-                INSERT_tasks = """
-                    INSERT INTO task_reminders (user_email, task_id, task_description, due_date, is_completed)
-                    VALUES (?, ?, ?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_tasks)
-                try:
-                    session.execute(prepared, (user_email, task_id, task_description, due_date, is_completed))
-                except Exception as e:
-                    print(f"Error al insertar datos de recordatorios de tareas: {e}")
-
-                view_date = datetime.now()
-                views = random.randint(10, 100)
-
-                # Insertar vistas del curso
-                INSERT_views = """
-                    INSERT INTO course_views (course_id, view_date, views)
-                    VALUES (?, ?, ?)
-                """
-                prepared = session.prepare(INSERT_views)
-                try:
-                    session.execute(prepared, (course_id, view_date, views))
-                except Exception as e:
-                    print(f"Error al insertar datos de vistas del curso: {e}")
-
-                instructor_email = teacher_email
-                instructor_name = teacher_name
-                ranking += 1
-                avg_rating = float(teacher_avg)
-                total_courses = random.randint(5, 20)
-                #print(f"Datos del instructor: {instructor_email}, {instructor_name}, {ranking},{avg_rating}, {total_courses}")
-                if instructor_email not in instructores_vistos:
-                # Insertar datos de los instructores    
-                    INSERT_Instructors = """
-                        INSERT INTO top_instructors (ranking, instructor_email, instructor_name, avg_rating, total_courses)
-                        VALUES (?, ?, ?, ?, ?);
-                    """
-                    prepared = session.prepare(INSERT_Instructors)
-                    try:
-                        session.execute(prepared, (ranking, instructor_email, instructor_name, avg_rating, total_courses))
-                        instructores_vistos.add(instructor_email)
-                    except Exception as e:
-                        print(f"Error al insertar datos del instructor: {e}")
-
-            except Exception as e:
-                log.error(f"Error insertando fila: {e}")
-
-    session.shutdown()
+    options = {
+        "mode": mode, "concurrency": concurrency, "batch_size": batch_size, "checkpoint_every": checkpoint_every,
+        "incremental": incremental, "rejects_path": rejects_path or f"{csv_path}.rejects.csv",
+        "dead_letter_path": dead_letter_path or f"{csv_path}.deadletter.jsonl",
+    }
+    # Los shards ya terminados sólo aportan su agregado de instructores guardado
+    done = [instructors_from_json(states.get(shard)) for shard in shards if offsets.get(shard, shard[0]) >= shard[1]]
+    tasks = [(csv_path, shard, offsets.get(shard, shard[0]), instructors_from_json(states.get(shard)), journal.path, options)
+             for shard in shards if offsets.get(shard, shard[0]) < shard[1]]
+    if len(tasks) > 1:
+        log.info(f"Procesando {len(tasks)} shards con {workers} procesos...")
+        # "spawn" para que ningún worker herede las conexiones del proceso padre
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=min(workers, len(tasks))) as pool:
+            results = pool.map(_load_shard, tasks)
+    else:
+        results = [ingest_shard(session, csv_path, shard, offset, instructores, journal, **options)
+                   for _, shard, offset, instructores, _, _ in tasks]
+    stats = merge_stats([shard_stats for shard_stats, _ in results])
+
+    if incremental:
+        dead_letter = DeadLetterFile(options["dead_letter_path"])
+        stats = merge_stats([stats, clean_incremental(session, csv_path, os.path.basename(csv_path), concurrency, dead_letter)])
+
+    # Etapa de agregación: un solo cálculo del ranking con todas las filas
+    write_leaderboard(session, merge_instructors(done + [instructores for _, instructores in results]), batch_size)
+
+    if mode != "sync" or workers > 1:
+        print_report(stats)
+
+    if validate:
+        validate_load(session, stats, full=not saved and not incremental)
+
+    # La carga terminó: la bitácora ya no hace falta y lo cacheado quedó viejo
+    journal.clear()
+    invalidate_all()
+    session.cluster.shutdown()
     print("✓ Datos de Cassandra cargados correctamente.")
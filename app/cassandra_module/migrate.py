@@ -0,0 +1,160 @@
+import csv
+import logging
+from collections import Counter
+from cassandra_module.cache import invalidate_user
+from cassandra_module.cluster import PROFILE_BULK_WRITE
+from cassandra_module.loader import row_hash_bucket
+from cassandra_module.purge import USER_TABLES, purge_users, read_user_indexes
+from cassandra_module.sharding import merge_stats
+from cassandra_module.statements import get_statement, partition_key
+from cassandra_module.writer import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, AsyncWriter, PartitionBatcher
+
+log = logging.getLogger(__name__)
+
+# Filas por página al leer las particiones del email anterior
+DEFAULT_FETCH_SIZE = 1000
+# Usuarios que se copian, verifican y borran por tanda
+DEFAULT_MIGRATION_CHUNK = 50
+
+
+def read_email_mapping(path):
+    # CSV "email_anterior,email_nuevo"; se ignoran el encabezado y las líneas sin emails
+    pairs = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and '@' in row[0] and '@' in row[1]:
+                pairs.append((row[0].strip(), row[1].strip()))
+    return pairs
+
+
+def invalid_pairs(pairs):
+    # Pares que no se pueden migrar en la misma operación, con el motivo.
+    # Copiar un email sobre sí mismo y después purgarlo borraría el
+    # historial; si un email nuevo también es anterior (a->b, b->c o a<->b)
+    # la copia lee particiones que otras copias están escribiendo y después
+    # se purgan ambas. Dos emails anteriores con el mismo nuevo (a->c, b->c)
+    # mezclarían a dos estudiantes sin que _verify lo note.
+    sources = Counter(old for old, _ in pairs)
+    targets = Counter(new for _, new in pairs)
+    problems = []
+    for old, new in pairs:
+        if old == new:
+            problems.append(((old, new), "el email nuevo es igual al anterior"))
+        elif new in sources:
+            problems.append(((old, new), f"{new} también es un email anterior en la misma migración"))
+        elif sources[old] > 1:
+            problems.append(((old, new), f"{old} aparece más de una vez como email anterior"))
+        elif targets[new] > 1:
+            problems.append(((old, new), f"{new} aparece más de una vez como email nuevo"))
+    return problems
+
+
+def user_partitions(email, courses, months, sources):
+    # (tabla, parámetros que ubican los datos del usuario) para cada
+    # partición o fila a copiar; el orden sólo depende de cursos, meses y
+    # archivos fuente, así la lista del email anterior y la del nuevo se corresponden
+    partitions = [(tabla, (email,)) for tabla in USER_TABLES + ["user_courses", "user_buckets", "user_sources"]]
+    partitions += [("course_performance", (course_id, email)) for course_id in courses]
+    for tabla, meses in months.items():
+        partitions += [(tabla, (email, month)) for month in meses]
+    partitions += [("load_row_hashes", (email, source, row_hash_bucket(email))) for source in sources]
+    return partitions
+
+
+def _copy_params(tabla, row, new_email):
+    # La fila con el nuevo email en la primera columna; en load_row_hashes el
+    # bucket también sale del email
+    params = (new_email,) + tuple(row)[1:]
+    if tabla == "load_row_hashes":
+        params = params[:2] + (row_hash_bucket(new_email),) + params[3:]
+    return params
+
+
+def _copy_partition(session, batcher, tabla, old_params, new_email, fetch_size):
+    # Lee la partición por páginas (memoria constante) y reescribe cada fila
+    # con el nuevo email (ver _copy_params); devuelve cuántas filas leyó
+    bound = get_statement(session, f"migrate_{tabla}").bind(old_params)
+    bound.fetch_size = fetch_size
+    name = f"insert_{tabla}"
+    insert = get_statement(session, name)
+    copied = 0
+    for row in session.execute(bound, execution_profile=PROFILE_BULK_WRITE):
+        params = _copy_params(tabla, row, new_email)
+        batcher.add(tabla, partition_key(name, params), name, insert, params)
+        copied += 1
+    return copied
+
+
+def _verify(session, expected):
+    # Cuenta en paralelo las filas bajo el nuevo email. Se acepta que haya más
+    # (el email nuevo ya podía tener datos) pero no menos de las copiadas.
+    futures = [(pair, tabla, copied, session.execute_async(get_statement(session, f"count_{tabla}"), new_params,
+                                                          execution_profile=PROFILE_BULK_WRITE))
+               for pair, partitions in expected.items() for tabla, new_params, copied in partitions if copied]
+    failed = set()
+    for pair, tabla, copied, future in futures:
+        try:
+            found = future.result().one()[0]
+        except Exception as e:
+            log.error(f"Error al verificar {tabla} de {pair[1]}: {e}")
+            failed.add(pair)
+            continue
+        if found < copied:
+            log.error(f"{tabla}: se copiaron {copied} filas de {pair[0]} pero {pair[1]} tiene {found}.")
+            failed.add(pair)
+    return failed
+
+
+def migrate_users(session, pairs, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                  chunk_size=DEFAULT_MIGRATION_CHUNK, fetch_size=DEFAULT_FETCH_SIZE):
+    # Mueve todos los datos de cada (email_anterior, email_nuevo): copia las
+    # particiones con batches concurrentes, verifica los conteos y sólo
+    # entonces purga las particiones anteriores. Devuelve
+    # ({tabla: {"ok", "error"}} de la copia, el del borrado, [pares fallidos]).
+    # Si algún par es inválido (ver invalid_pairs) no se migra ninguno.
+    problems = invalid_pairs(pairs)
+    if problems:
+        raise ValueError("; ".join(f"{old} -> {new}: {motivo}" for (old, new), motivo in problems))
+    writer = AsyncWriter(session, concurrency)
+    copy_stats, purge_stats, failed = [], [], []
+
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        indexes, errors = read_user_indexes(session, [old for old, _ in chunk])
+        copy_stats.append(errors)
+        batcher = PartitionBatcher(writer, batch_size)
+        expected = {}
+        for old, new in chunk:
+            if old not in indexes:
+                failed.append((old, new))
+                continue
+            courses, months, sources = indexes[old]
+            partitions = expected.setdefault((old, new), [])
+            for (tabla, old_params), (_, new_params) in zip(user_partitions(old, courses, months, sources),
+                                                            user_partitions(new, courses, months, sources)):
+                copied = _copy_partition(session, batcher, tabla, old_params, new, fetch_size)
+                partitions.append((tabla, new_params, copied))
+        batcher.flush()
+        stats = writer.drain()
+        copy_stats.append(stats)
+        # purge_users invalida los emails anteriores y sus cursos; faltan los nuevos
+        for _, new in expected:
+            invalidate_user(new)
+
+        if any(counts["error"] for counts in stats.values()):
+            # No se sabe qué usuario falló: no se borra nada de la tanda
+            log.warning("Hubo errores al copiar la tanda; se conservan los datos anteriores.")
+            failed.extend(expected)
+            continue
+        bad = _verify(session, expected)
+        failed.extend(bad)
+        verified = [old for old, new in expected if (old, new) not in bad]
+        if verified:
+            purge_stats.append(purge_users(session, verified, concurrency))
+        log.info(f"Migrados {len(verified)} de {len(chunk)} usuarios de la tanda.")
+
+    return merge_stats(copy_stats), merge_stats(purge_stats), failed
+
+
+def migrate_user(session, old_email, new_email, **options):
+    return migrate_users(session, [(old_email, new_email)], **options)
@@ -4,6 +4,7 @@ import uuid
 from datetime import datetime
 from cassandra.cluster import Cluster
 import csv
+from cassandra_module.statements import get_statement
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -158,22 +159,14 @@ def populate_data_from_csv(session, filepath):
                     grade = float(grade)
                     activity_id = uuid.UUID(activity_id)  # Convertir a UUID
                     
-                    INSERT_student_activity = """
-                        INSERT INTO student_activity (user_email, course_id, tipo_actividad, timestamp, activity_id, detalles)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_student_activity)
+                    prepared = get_statement(session, "insert_student_activity")
                     try:
                         session.execute(prepared, (user_email, course_id, tipo_actividad, timestamp, activity_id, detalles))
                         log.info(f"Datos insertados para {user_email} en la actividad {activity_id}.")
                     except Exception as e:
                         print(f"Error al insertar datos de actividad del estudiante: {e}")
 
-                    INSERT_course_progress = """
-                        INSERT INTO course_progress (user_email, course_id, progress_percent, grade)
-                        VALUES (?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_course_progress)
+                    prepared = get_statement(session, "insert_course_progress")
                     try:
                         session.execute(prepared, (user_email, course_id, progress_percent, grade))
                         log.info(f"Datos insertados para {user_email} en el curso {course_id}.")
@@ -184,11 +177,7 @@ def populate_data_from_csv(session, filepath):
                     tipo_notificacion = random.choice(['Anuncio', 'Recordatorio', 'Calificación'])
                     mensaje = f"{tipo_notificacion} para {user_email}"
 
-                    INSERT_system_notifications = """
-                        INSERT INTO system_notifications (user_email, timestamp, notification_id, course_id, tipo, notificacion)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_system_notifications)
+                    prepared = get_statement(session, "insert_system_notifications")
                     try:
                         session.execute(prepared, (user_email, timestamp, notification_id, course_id, tipo_notificacion, mensaje))
                         log.info(f"Datos insertados para {user_email} en la notificación {notification_id}.")
@@ -198,11 +187,7 @@ def populate_data_from_csv(session, filepath):
                     session_id = uuid.uuid4()
                     last_activity = datetime.now()
 
-                    INSERT_user_sessions = """
-                        INSERT INTO user_sessions (user_email, session_id, device_info, last_activity)
-                        VALUES (?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_user_sessions)
+                    prepared = get_statement(session, "insert_user_sessions")
                     try:
                         session.execute(prepared, (user_email, session_id, device_info, last_activity))
                         log.info(f"Datos insertados para {user_email} en la sesión {session_id}.")
@@ -214,11 +199,7 @@ def populate_data_from_csv(session, filepath):
                     completion_date = datetime.now().date()
                     certificate_url = f"https://certificados.com/{student_name}_curso"
 
-                    INSERT_certificates = """
-                        INSERT INTO certificates (user_email, completion_date, certificate_id, course_id, student_name, course_title, certificate_url)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_certificates)
+                    prepared = get_statement(session, "insert_certificates")
                     try:
                         session.execute(prepared, (user_email, completion_date, certificate_id, course_id, student_name, course_id, certificate_url))
                         log.info(f"Datos insertados para {user_email} en el curso {course_id}.")
@@ -226,11 +207,7 @@ def populate_data_from_csv(session, filepath):
                         print(f"Error al insertar datos de certificados: {e}")
 
 
-                    INSERT_course_performance = """
-                        INSERT INTO course_performance (user_email, course_id, progress_percent, grade)
-                        VALUES (?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_course_performance)
+                    prepared = get_statement(session, "insert_course_performance")
                     try:
                         session.execute(prepared, (user_email, course_id, progress_percent, grade))
                         log.info(f"Datos insertados para {user_email} en el curso {course_id}.")
@@ -243,11 +220,7 @@ def populate_data_from_csv(session, filepath):
                     device_info = random.choice(['Windows 10 - Chrome', 'MacBook - Safari', 'Android - Firefox'])
                     active_status = random.choice([True, False])
 
-                    INSERT_login_logs = """
-                        INSERT INTO login_logs (user_email, last_activity, session_id, start_time, device_info, active_status)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_login_logs)
+                    prepared = get_statement(session, "insert_login_logs")
                     try:
                         session.execute(prepared, (user_email, last_activity, session_id, start_time, device_info, active_status))
                         log.info(f"Datos insertados para {user_email} en la sesión {session_id}.")
@@ -260,11 +233,7 @@ def populate_data_from_csv(session, filepath):
                     due_date = datetime.now().date()
                     is_completed = random.choice([True, False])
 
-                    INSERT_tasks = """
-                        INSERT INTO task_reminders (user_email, task_id, task_description, due_date, is_completed)
-                        VALUES (?, ?, ?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_tasks)
+                    prepared = get_statement(session, "insert_task_reminders")
                     try:
                         session.execute(prepared, (user_email, task_id, task_description, due_date, is_completed))
                         log.info(f"Datos insertados para {user_email} en la tarea {task_description}.")
@@ -275,11 +244,7 @@ def populate_data_from_csv(session, filepath):
                     views = random.randint(10, 100)
 
                     # Insertar vistas del curso
-                    INSERT_views = """
-                        INSERT INTO course_views (course_id, view_date, views)
-                        VALUES (?, ?, ?)
-                    """
-                    prepared = session.prepare(INSERT_views)
+                    prepared = get_statement(session, "insert_course_views")
                     try:
                         session.execute(prepared, (course_id, view_date, views))
                         log.info(f"Datos insertados para {course_id} en la fecha {view_date}.")
@@ -294,11 +259,7 @@ def populate_data_from_csv(session, filepath):
                     #print(f"Datos del instructor: {instructor_email}, {instructor_name}, {ranking},{avg_rating}, {total_courses}")
                     if instructor_email not in instructores:
                     # Insertar datos de los instructores    
-                        INSERT_Instructors = """
-                            INSERT INTO top_instructors (ranking, instructor_email, instructor_name, avg_rating, total_courses)
-                            VALUES (?, ?, ?, ?, ?);
-                        """
-                        prepared = session.prepare(INSERT_Instructors)
+                        prepared = get_statement(session, "insert_top_instructors")
                         try:
                             session.execute(prepared, (ranking, instructor_email, instructor_name, avg_rating, total_courses))
                             log.info(f"Datos insertados para {instructor_email} en el curso {instructor_name}.")
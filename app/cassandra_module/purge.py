@@ -0,0 +1,129 @@
+import logging
+from cassandra_module.buckets import BUCKETED_TABLES
+from cassandra_module.cache import invalidate_course, invalidate_user
+from cassandra_module.cluster import PROFILE_BULK_WRITE
+from cassandra_module.loader import row_hash_bucket
+from cassandra_module.sharding import merge_stats
+from cassandra_module.statements import get_statement
+from cassandra_module.writer import DEFAULT_CONCURRENCY, AsyncWriter, DeadLetterFile
+
+log = logging.getLogger(__name__)
+
+# Tablas particionadas sólo por user_email: se borra la partición completa
+USER_TABLES = [
+    "student_activity",
+    "course_progress",
+    "system_notifications",
+    "user_sessions",
+    "certificates",
+    "login_logs",
+    "task_reminders",
+]
+
+# Usuarios cuyos índices se leen y cuyos borrados se envían por tanda
+DEFAULT_PURGE_CHUNK = 200
+
+
+def read_emails(path):
+    # Un email por línea; se ignoran líneas vacías y repetidas
+    emails = []
+    vistos = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            email = line.strip()
+            if email and email not in vistos:
+                vistos.add(email)
+                emails.append(email)
+    return emails
+
+
+def read_user_indexes(session, emails):
+    # Lee en paralelo los cursos (user_courses), meses (user_buckets) y
+    # archivos fuente (user_sources) de cada usuario. Devuelve
+    # {email: ([cursos], {tabla: [meses]}, [fuentes])} y los errores.
+    courses_stmt = get_statement(session, "select_user_courses")
+    months_stmt = get_statement(session, "select_user_buckets")
+    sources_stmt = get_statement(session, "select_user_sources")
+    futures = []
+    for email in emails:
+        futures.append((email, "user_courses", None,
+                        session.execute_async(courses_stmt, (email,), execution_profile=PROFILE_BULK_WRITE)))
+        futures.append((email, "user_sources", None,
+                        session.execute_async(sources_stmt, (email,), execution_profile=PROFILE_BULK_WRITE)))
+        for tabla in BUCKETED_TABLES:
+            futures.append((email, "user_buckets", tabla,
+                            session.execute_async(months_stmt, (email, tabla), execution_profile=PROFILE_BULK_WRITE)))
+    indexes = {email: ([], {}, []) for email in emails}
+    errors = {}
+    for email, index, tabla, future in futures:
+        try:
+            rows = future.result()
+        except Exception as e:
+            log.error(f"Error al leer {index} de {email}: {e}")
+            errors.setdefault(index, {"ok": 0, "error": 0})["error"] += 1
+            indexes.pop(email, None)
+            continue
+        if email not in indexes:
+            continue
+        courses, months, sources = indexes[email]
+        if index == "user_courses":
+            courses.extend(row.course_id for row in rows)
+        elif index == "user_sources":
+            sources.extend(row.source for row in rows)
+        else:
+            months[tabla] = [row.month for row in rows]
+    return indexes, errors
+
+
+def purge_users(session, emails, concurrency=DEFAULT_CONCURRENCY, chunk_size=DEFAULT_PURGE_CHUNK,
+                dead_letter_path=None):
+    # Borra todos los datos de los usuarios indicados y devuelve
+    # {tabla: {"ok": n, "error": n}}. Los borrados de cada tanda salen en
+    # paralelo por un AsyncWriter: las particiones por usuario, las filas del
+    # usuario en course_performance (vía user_courses), sus particiones
+    # mensuales (vía user_buckets) y sus hashes del modo incremental (vía
+    # user_sources). Los índices de un usuario sólo se borran si todos sus
+    # datos se borraron, para poder repetir la purga. Si el CSV todavía tiene
+    # filas del usuario, la próxima carga incremental las vuelve a escribir.
+    dead_letter = DeadLetterFile(dead_letter_path) if dead_letter_path else None
+    writer = AsyncWriter(session, concurrency, dead_letter=dead_letter)
+    emails = list(emails)
+    all_stats = []
+
+    def submit(name, params):
+        writer.submit(name.split("_", 1)[1], get_statement(session, name), params, items=[(name, params)])
+
+    for start in range(0, len(emails), chunk_size):
+        chunk = emails[start:start + chunk_size]
+        indexes, errors = read_user_indexes(session, chunk)
+        all_stats.append(errors)
+        for email, (courses, months, sources) in indexes.items():
+            for tabla in USER_TABLES:
+                submit(f"delete_{tabla}", (email,))
+            for course_id in courses:
+                submit("delete_course_performance", (course_id, email))
+            for tabla, meses in months.items():
+                for month in meses:
+                    submit(f"delete_{tabla}", (email, month))
+            for source in sources:
+                submit("delete_load_row_hashes", (email, source, row_hash_bucket(email)))
+        stats = writer.drain()
+        all_stats.append(stats)
+        # Se invalida con los borrados ya confirmados: una lectura anterior
+        # volvería a cachear filas a punto de borrarse durante todo el TTL
+        for email, (courses, _, _) in indexes.items():
+            invalidate_user(email)
+            for course_id in courses:
+                invalidate_course(course_id)
+
+        if any(counts["error"] for counts in stats.values()):
+            log.warning("Hubo errores al borrar datos; se conservan los índices de la tanda para reintentar.")
+            continue
+        for email in indexes:
+            submit("delete_user_courses", (email,))
+            submit("delete_user_buckets", (email,))
+            submit("delete_user_sources", (email,))
+        all_stats.append(writer.drain())
+        log.info(f"Purgados {min(start + chunk_size, len(emails))} de {len(emails)} usuarios.")
+
+    return merge_stats(all_stats)
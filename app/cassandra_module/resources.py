@@ -0,0 +1,196 @@
+import base64
+import uuid
+from datetime import date, datetime, time
+from cassandra_module.buckets import DEFAULT_LIMIT, fetch_bucketed
+from cassandra_module.cache import progress_cache
+from cassandra_module.cluster import PROFILE_INTERACTIVE_READ, get_session
+from cassandra_module.statements import get_statement
+from cassandra_module.view_counts import fetch_course_views
+
+# Consultas del menú de Cassandra sin input() ni print(), para reutilizarlas
+# desde servicios o benchmarks. Todas usan sentencias preparadas del registro
+# y reciben valores tipados; las fechas también se aceptan como 'YYYY-MM-DD'.
+
+
+def a_fecha(valor):
+    # datetime para columnas timestamp
+    if isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, date):
+        return datetime.combine(valor, time.min)
+    return datetime.strptime(valor.strip(), "%Y-%m-%d")
+
+
+def a_dia(valor):
+    # date para columnas date
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor.strip(), "%Y-%m-%d").date()
+
+
+def a_uuid(valor):
+    return valor if isinstance(valor, uuid.UUID) else uuid.UUID(str(valor).strip())
+
+
+# Filas por página en las consultas paginadas
+DEFAULT_FETCH_SIZE = 20
+# Filas por tabla en el dashboard del estudiante
+DEFAULT_DASHBOARD_LIMIT = 10
+
+# Sección del dashboard -> sentencia por usuario que la llena
+DASHBOARD_QUERIES = {
+    "actividades": "select_activities",
+    "progreso": "select_progress",
+    "notificaciones": "select_notifications",
+    "sesiones": "select_user_sessions",
+    "certificados": "select_certificates",
+    "logs_inicio": "select_login_logs",
+    "tareas": "select_tasks",
+}
+
+
+def _consultar(session, nombre, params):
+    return list(session.execute(get_statement(session, nombre), params, execution_profile=PROFILE_INTERACTIVE_READ))
+
+
+def codificar_cursor(paging_state):
+    return base64.urlsafe_b64encode(paging_state).decode('ascii') if paging_state else None
+
+
+def decodificar_cursor(cursor):
+    return base64.urlsafe_b64decode(cursor.encode('ascii')) if cursor else None
+
+
+def _pagina(session, nombre, params, fetch_size, cursor):
+    # Trae sólo una página del servidor. Devuelve (filas, cursor); el cursor es
+    # el paging_state en base64 (None si no hay más páginas) y permite pedir
+    # la siguiente más tarde sin volver a leer las anteriores.
+    bound = get_statement(session, nombre).bind(params)
+    bound.fetch_size = fetch_size
+    result = session.execute(bound, paging_state=decodificar_cursor(cursor), execution_profile=PROFILE_INTERACTIVE_READ)
+    return list(result.current_rows), codificar_cursor(result.paging_state)
+
+
+# Actividades de un estudiante, opcionalmente en un rango de fechas
+def obtener_actividades(session, user_email, fecha_inicio=None, fecha_fin=None):
+    if fecha_inicio is None and fecha_fin is None:
+        return _consultar(session, "select_activities", (user_email,))
+    return _consultar(session, "select_activities_by_range", (user_email, a_fecha(fecha_inicio), a_fecha(fecha_fin)))
+
+
+# Progreso de un estudiante en todos sus cursos o en uno (con cache)
+def obtener_progreso(session, user_email, course_id=None):
+    if course_id is None:
+        return progress_cache.get_or_load(("course_progress", user_email, None),
+                                          lambda: _consultar(session, "select_progress", (user_email,)))
+    return progress_cache.get_or_load(("course_progress", user_email, course_id),
+                                      lambda: _consultar(session, "select_progress_by_course", (user_email, course_id)))
+
+
+# Notificaciones del sistema, opcionalmente en un rango de fechas
+def obtener_notificaciones(session, user_email, fecha_inicio=None, fecha_fin=None):
+    if fecha_inicio is None and fecha_fin is None:
+        return _consultar(session, "select_notifications", (user_email,))
+    return _consultar(session, "select_notifications_by_range", (user_email, a_fecha(fecha_inicio), a_fecha(fecha_fin)))
+
+
+# Sesiones de un usuario, todas o una por id
+def obtener_sesiones(session, user_email, session_id=None):
+    if session_id is None:
+        return _consultar(session, "select_user_sessions", (user_email,))
+    return _consultar(session, "select_user_session_by_id", (user_email, a_uuid(session_id)))
+
+
+# Certificados de un estudiante, todos o los de una fecha
+def obtener_certificados(session, user_email, fecha=None):
+    if fecha is None:
+        return _consultar(session, "select_certificates", (user_email,))
+    return _consultar(session, "select_certificates_by_date", (user_email, a_dia(fecha)))
+
+
+# Desempeño de los estudiantes de un curso (con cache)
+def obtener_desempeno_curso(session, course_id):
+    return progress_cache.get_or_load(("course_performance", course_id),
+                                      lambda: _consultar(session, "select_course_performance", (course_id,)))
+
+
+# Logs de inicio de sesión, opcionalmente en un rango de fechas
+def obtener_logs_inicio(session, user_email, fecha_inicio=None, fecha_fin=None):
+    if fecha_inicio is None and fecha_fin is None:
+        return _consultar(session, "select_login_logs", (user_email,))
+    return _consultar(session, "select_login_logs_by_range", (user_email, a_fecha(fecha_inicio), a_fecha(fecha_fin)))
+
+
+# Recordatorios de tareas, todos o uno por id
+def obtener_tareas(session, user_email, task_id=None):
+    if task_id is None:
+        return _consultar(session, "select_tasks", (user_email,))
+    return _consultar(session, "select_task_by_id", (user_email, a_uuid(task_id)))
+
+
+# Vistas de un curso por día y hora: [(día, hora, vistas), ...]
+def obtener_vistas_curso(session, course_id, fecha_inicio, fecha_fin):
+    return fetch_course_views(session, course_id, a_dia(fecha_inicio), a_dia(fecha_fin))
+
+
+# Instructores mejor calificados, ya ordenados por el servidor
+def obtener_top_instructores(session, limit=10, board="global"):
+    return _consultar(session, "select_top_instructors", (board, limit))
+
+
+# Actividades desde la tabla por mes: sólo se leen los meses del rango con datos y se
+# deja de leer al juntar `limit` filas (de la más reciente a la más antigua)
+def actividades_por_mes(session, user_email, fecha_inicio=None, fecha_fin=None, limit=DEFAULT_LIMIT):
+    inicio = a_fecha(fecha_inicio) if fecha_inicio is not None else None
+    fin = a_fecha(fecha_fin) if fecha_fin is not None else None
+    return fetch_bucketed(session, "student_activity_by_month", user_email, inicio, fin, limit)
+
+
+# Logs de inicio de sesión desde la tabla por mes
+def logs_inicio_por_mes(session, user_email, fecha_inicio=None, fecha_fin=None, limit=DEFAULT_LIMIT):
+    inicio = a_fecha(fecha_inicio) if fecha_inicio is not None else None
+    fin = a_fecha(fecha_fin) if fecha_fin is not None else None
+    return fetch_bucketed(session, "login_logs_by_month", user_email, inicio, fin, limit)
+
+
+# Versiones paginadas de las consultas de historial, que pueden ser muy largas
+
+def pagina_actividades(session, user_email, fecha_inicio=None, fecha_fin=None, fetch_size=DEFAULT_FETCH_SIZE, cursor=None):
+    if fecha_inicio is None and fecha_fin is None:
+        return _pagina(session, "select_activities", (user_email,), fetch_size, cursor)
+    return _pagina(session, "select_activities_by_range", (user_email, a_fecha(fecha_inicio), a_fecha(fecha_fin)), fetch_size, cursor)
+
+
+def pagina_notificaciones(session, user_email, fecha_inicio=None, fecha_fin=None, fetch_size=DEFAULT_FETCH_SIZE, cursor=None):
+    if fecha_inicio is None and fecha_fin is None:
+        return _pagina(session, "select_notifications", (user_email,), fetch_size, cursor)
+    return _pagina(session, "select_notifications_by_range", (user_email, a_fecha(fecha_inicio), a_fecha(fecha_fin)), fetch_size, cursor)
+
+
+def pagina_logs_inicio(session, user_email, fecha_inicio=None, fecha_fin=None, fetch_size=DEFAULT_FETCH_SIZE, cursor=None):
+    if fecha_inicio is None and fecha_fin is None:
+        return _pagina(session, "select_login_logs", (user_email,), fetch_size, cursor)
+    return _pagina(session, "select_login_logs_by_range", (user_email, a_fecha(fecha_inicio), a_fecha(fecha_fin)), fetch_size, cursor)
+
+
+# Todo lo de un estudiante en una sola llamada: las siete consultas salen a la
+# vez con execute_async y cada una trae sólo su primera página de `limit`
+# filas, así la latencia es la de la consulta más lenta y no la suma.
+# Una sección que falla queda vacía y su error se reporta en "errores".
+def get_student_dashboard(user_email, session=None, limit=DEFAULT_DASHBOARD_LIMIT):
+    session = session or get_session()
+    futures = {}
+    for seccion, nombre in DASHBOARD_QUERIES.items():
+        bound = get_statement(session, nombre).bind((user_email,))
+        bound.fetch_size = limit
+        futures[seccion] = session.execute_async(bound, execution_profile=PROFILE_INTERACTIVE_READ)
+    dashboard = {"user_email": user_email, "errores": {}}
+    for seccion, future in futures.items():
+        try:
+            dashboard[seccion] = list(future.result().current_rows)[:limit]
+        except Exception as e:
+            dashboard[seccion] = []
+            dashboard["errores"][seccion] = str(e)
+    return dashboard
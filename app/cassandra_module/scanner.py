@@ -0,0 +1,167 @@
+import csv
+import json
+import logging
+import math
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+from cassandra_module.cluster import PROFILE_ANALYTICS, get_session
+from cassandra_module.statements import SCAN_TABLES, get_statement
+
+log = logging.getLogger(__name__)
+
+# Extremos del anillo de tokens de Murmur3Partitioner
+MIN_TOKEN = -2 ** 63
+MAX_TOKEN = 2 ** 63 - 1
+
+# Subrangos por nodo: varios por nodo para repartir el trabajo entre núcleos
+DEFAULT_SPLITS_PER_HOST = 16
+DEFAULT_CONCURRENCY = 16
+DEFAULT_FETCH_SIZE = 5000
+
+
+def split_range(start, end, parts):
+    # Divide (start, end] en `parts` subrangos contiguos (inicio, fin]
+    step = max(1, (end - start) // parts)
+    bounds = [start + i * step for i in range(parts) if start + i * step < end] + [end]
+    return list(zip(bounds, bounds[1:]))
+
+
+def split_token_ring(splits):
+    # Divide el anillo completo en `splits` subrangos iguales
+    return split_range(MIN_TOKEN, MAX_TOKEN, splits)
+
+
+def default_splits(session):
+    return DEFAULT_SPLITS_PER_HOST * max(1, len(session.cluster.metadata.all_hosts()))
+
+
+def token_ranges(session, splits=None):
+    # Subrangos alineados con el anillo real (cluster.metadata.token_map):
+    # cada rango (token anterior, token] pertenece a las mismas réplicas, y
+    # se subdivide hasta juntar unos `splits` en total. El tramo que da la
+    # vuelta al anillo queda como (último, MAX] y (MIN, primero], ambos del
+    # primer token. Se intercalan por nodo dueño para repartir la carga.
+    splits = splits or default_splits(session)
+    token_map = session.cluster.metadata.token_map
+    if not token_map or not token_map.ring:
+        return split_token_ring(splits)
+    ring = [token.value for token in token_map.ring]
+    owned = [(MIN_TOKEN, ring[0])] + list(zip(ring, ring[1:])) + [(ring[-1], MAX_TOKEN)]
+    owned = [(start, end) for start, end in owned if start < end]
+    parts = max(1, math.ceil(splits / len(owned)))
+    by_host = {}
+    for start, end in owned:
+        owner = token_map.token_to_host_owner.get(token_map.token_class(end if end != MAX_TOKEN else ring[0]))
+        by_host.setdefault(owner, []).extend(split_range(start, end, parts))
+    return [r for r in chain.from_iterable(zip_longest(*by_host.values())) if r is not None]
+
+
+def _bind_range(statement, token_range):
+    # El token final del subrango sirve para enrutar la consulta a una de sus
+    # réplicas (ver cluster.RangeAwarePolicy)
+    bound = statement.bind(token_range)
+    bound.routing_token = token_range[1]
+    return bound
+
+
+def _run_ranges(session, work, splits, concurrency):
+    ranges = token_ranges(session, splits)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(work, ranges))
+
+
+def scan_table(session, tabla, callback, splits=None, concurrency=DEFAULT_CONCURRENCY, fetch_size=DEFAULT_FETCH_SIZE):
+    # Recorre la tabla completa con consultas token(pk) > ? AND token(pk) <= ?
+    # en paralelo, paginando cada subrango. callback(columnas, fila) recibe
+    # cada fila como tupla; se llama con un lock, así no necesita ser thread-safe.
+    # Devuelve el total de filas leídas.
+    statement = get_statement(session, f"scan_{tabla}")
+    lock = threading.Lock()
+
+    def work(token_range):
+        bound = _bind_range(statement, token_range)
+        bound.fetch_size = fetch_size
+        result = session.execute(bound, execution_profile=PROFILE_ANALYTICS)
+        read = 0
+        while True:
+            rows = result.current_rows
+            if rows:
+                with lock:
+                    for row in rows:
+                        callback(result.column_names, row)
+                read += len(rows)
+            if not result.has_more_pages:
+                return read
+            result.fetch_next_page()
+
+    total = sum(_run_ranges(session, work, splits, concurrency))
+    log.info(f"{tabla}: {total} filas recorridas.")
+    return total
+
+
+def count_table(session, tabla, splits=None, concurrency=DEFAULT_CONCURRENCY):
+    # COUNT(*) por subrango en paralelo; cada nodo sólo cuenta sus tokens
+    statement = get_statement(session, f"scan_count_{tabla}")
+
+    def work(token_range):
+        return session.execute(_bind_range(statement, token_range), execution_profile=PROFILE_ANALYTICS).one()[0]
+
+    return sum(_run_ranges(session, work, splits, concurrency))
+
+
+def count_tables(session, tablas=None, splits=None, concurrency=DEFAULT_CONCURRENCY):
+    return {tabla: count_table(session, tabla, splits, concurrency) for tabla in (tablas or SCAN_TABLES)}
+
+
+class JsonlExporter:
+    # Callback para scan_table que escribe una línea JSON por fila
+
+    def __init__(self, f):
+        self.f = f
+
+    def __call__(self, columns, row):
+        self.f.write(json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + "\n")
+
+
+class CsvExporter:
+    # Callback para scan_table que escribe un CSV con encabezado
+
+    def __init__(self, f):
+        self.writer = csv.writer(f)
+        self.header = False
+
+    def __call__(self, columns, row):
+        if not self.header:
+            self.writer.writerow(columns)
+            self.header = True
+        self.writer.writerow(row)
+
+
+def export_table(session, tabla, path, splits=None, concurrency=DEFAULT_CONCURRENCY):
+    # Exporta la tabla completa a JSONL o CSV según la extensión de `path`
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        exporter = CsvExporter(f) if path.endswith(".csv") else JsonlExporter(f)
+        total = scan_table(session, tabla, exporter, splits, concurrency)
+    print(f"✓ {total} filas de {tabla} exportadas a {path}")
+    return total
+
+
+def main(argv):
+    # python -m cassandra_module.scanner count [tabla ...]
+    # python -m cassandra_module.scanner export <tabla> <archivo.jsonl|archivo.csv>
+    if len(argv) >= 1 and argv[0] == "count":
+        session = get_session()
+        for tabla, total in count_tables(session, argv[1:] or None).items():
+            print(f"{tabla}: {total} filas")
+    elif len(argv) == 3 and argv[0] == "export":
+        export_table(get_session(), argv[1], argv[2])
+    else:
+        print("Uso: scanner count [tabla ...] | scanner export <tabla> <archivo.jsonl|archivo.csv>")
+        return
+    get_session().cluster.shutdown()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
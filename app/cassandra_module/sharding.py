@@ -0,0 +1,64 @@
+import csv
+import os
+
+# Reparto de un CSV en rangos de bytes alineados a inicio de línea, para que
+# cada proceso lea y escriba su parte del archivo de forma independiente.
+# Supone que ningún campo contiene saltos de línea (como en test.csv).
+
+
+def header_length(csv_path):
+    with open(csv_path, 'rb') as f:
+        return len(f.readline())
+
+
+def split_shards(csv_path, workers):
+    # Devuelve [(inicio, fin), ...] en bytes, sin incluir el encabezado
+    start = header_length(csv_path)
+    size = os.path.getsize(csv_path)
+    bounds = [start]
+    with open(csv_path, 'rb') as f:
+        for i in range(1, workers):
+            target = start + (size - start) * i // workers
+            # Retroceder un byte y terminar la línea actual: así un límite que
+            # cae justo en un inicio de línea no se salta esa línea
+            f.seek(max(target - 1, start))
+            f.readline()
+            bounds.append(max(f.tell(), bounds[-1]))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def iter_lines(csv_path, start, end):
+    # Líneas del rango [inicio, fin) junto con el offset en que termina cada una
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        while offset < end:
+            line = f.readline()
+            if not line:
+                break
+            offset += len(line)
+            yield offset, line.decode('utf-8')
+
+
+def read_chunks(csv_path, start, end, chunk_size):
+    # Bloques de hasta `chunk_size` filas junto con el offset donde termina cada bloque
+    lines = []
+    offset = start
+    for offset, line in iter_lines(csv_path, start, end):
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            yield offset, list(csv.reader(lines))
+            lines = []
+    if lines:
+        yield offset, list(csv.reader(lines))
+
+
+def merge_stats(all_stats):
+    merged = {}
+    for stats in all_stats:
+        for table, counts in stats.items():
+            total = merged.setdefault(table, {"ok": 0, "error": 0})
+            total["ok"] += counts["ok"]
+            total["error"] += counts["error"]
+    return merged
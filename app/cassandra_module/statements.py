@@ -0,0 +1,372 @@
+import logging
+import weakref
+from cassandra_module.cluster import KEYSPACE
+
+log = logging.getLogger(__name__)
+
+# Todas las sentencias CQL que usa el proyecto, con marcadores "?" para
+# prepararlas una sola vez por sesión en lugar de una vez por fila, y con el
+# nombre de tabla completo (<keyspace>.<tabla>) para no depender de USE.
+QUERIES = {
+    # === INSERTS (loader) ===
+    "insert_student_activity": f"""
+        INSERT INTO {KEYSPACE}.student_activity (user_email, course_id, tipo_actividad, timestamp, activity_id, detalles)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "insert_course_progress": f"""
+        INSERT INTO {KEYSPACE}.course_progress (user_email, course_id, progress_percent, grade)
+        VALUES (?, ?, ?, ?)
+    """,
+    "insert_system_notifications": f"""
+        INSERT INTO {KEYSPACE}.system_notifications (user_email, timestamp, notification_id, course_id, tipo, notificacion)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "insert_user_sessions": f"""
+        INSERT INTO {KEYSPACE}.user_sessions (user_email, session_id, device_info, last_activity)
+        VALUES (?, ?, ?, ?)
+    """,
+    "insert_certificates": f"""
+        INSERT INTO {KEYSPACE}.certificates (user_email, completion_date, certificate_id, course_id, student_name, course_title, certificate_url)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "insert_course_performance": f"""
+        INSERT INTO {KEYSPACE}.course_performance (user_email, course_id, progress_percent, grade)
+        VALUES (?, ?, ?, ?)
+    """,
+    "insert_login_logs": f"""
+        INSERT INTO {KEYSPACE}.login_logs (user_email, last_activity, session_id, start_time, device_info, active_status)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "insert_task_reminders": f"""
+        INSERT INTO {KEYSPACE}.task_reminders (user_email, task_id, task_description, due_date, is_completed)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "insert_course_views": f"""
+        INSERT INTO {KEYSPACE}.course_views (course_id, view_date, views)
+        VALUES (?, ?, ?)
+    """,
+    "insert_top_instructors": f"""
+        INSERT INTO {KEYSPACE}.top_instructors (ranking, instructor_email, instructor_name, avg_rating, total_courses)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "insert_instructor_leaderboard": f"""
+        INSERT INTO {KEYSPACE}.instructor_leaderboard (board, avg_rating, instructor_email, instructor_name, total_courses)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "insert_load_row_hashes": f"""
+        INSERT INTO {KEYSPACE}.load_row_hashes (user_email, source, bucket, row_key, row_hash, row_data, previous_data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "update_course_view_counts": f"""
+        UPDATE {KEYSPACE}.course_view_counts SET views = views + ?
+        WHERE course_id = ? AND day = ? AND hour = ?
+    """,
+    "insert_student_activity_by_month": f"""
+        INSERT INTO {KEYSPACE}.student_activity_by_month (user_email, month, timestamp, activity_id, course_id, tipo_actividad, detalles)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "insert_login_logs_by_month": f"""
+        INSERT INTO {KEYSPACE}.login_logs_by_month (user_email, month, last_activity, session_id, start_time, device_info, active_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "insert_user_buckets": f"""
+        INSERT INTO {KEYSPACE}.user_buckets (user_email, tabla, month)
+        VALUES (?, ?, ?)
+    """,
+    "insert_user_courses": f"""
+        INSERT INTO {KEYSPACE}.user_courses (user_email, course_id)
+        VALUES (?, ?)
+    """,
+    "insert_user_sources": f"""
+        INSERT INTO {KEYSPACE}.user_sources (user_email, source)
+        VALUES (?, ?)
+    """,
+    "insert_user_basic": f"""
+        INSERT INTO {KEYSPACE}.user_basic (user_id, email, name, inserted_at)
+        VALUES (?, ?, ?, ?)
+    """,
+
+    # === SELECTS (menú de consultas) ===
+    "select_activities": f"""
+        SELECT tipo_actividad, timestamp, activity_id, detalles
+        FROM {KEYSPACE}.student_activity
+        WHERE user_email = ?
+    """,
+    "select_activities_by_range": f"""
+        SELECT tipo_actividad, timestamp, activity_id, detalles
+        FROM {KEYSPACE}.student_activity
+        WHERE user_email = ? AND timestamp >= ? AND timestamp <= ?
+    """,
+    "select_progress": f"""
+        SELECT course_id, progress_percent, grade
+        FROM {KEYSPACE}.course_progress
+        WHERE user_email = ?
+    """,
+    "select_progress_by_course": f"""
+        SELECT course_id, progress_percent, grade
+        FROM {KEYSPACE}.course_progress
+        WHERE user_email = ? AND course_id = ?
+    """,
+    "select_notifications": f"""
+        SELECT timestamp, notification_id, course_id, tipo, notificacion
+        FROM {KEYSPACE}.system_notifications
+        WHERE user_email = ?
+    """,
+    "select_notifications_by_range": f"""
+        SELECT timestamp, notification_id, course_id, tipo, notificacion
+        FROM {KEYSPACE}.system_notifications
+        WHERE user_email = ? AND timestamp >= ? AND timestamp <= ?
+    """,
+    "select_user_sessions": f"""
+        SELECT session_id, device_info, last_activity
+        FROM {KEYSPACE}.user_sessions
+        WHERE user_email = ?
+    """,
+    "select_user_session_by_id": f"""
+        SELECT session_id, device_info, last_activity
+        FROM {KEYSPACE}.user_sessions
+        WHERE user_email = ? AND session_id = ?
+    """,
+    "select_certificates": f"""
+        SELECT completion_date, certificate_id, course_id, student_name, course_title, certificate_url
+        FROM {KEYSPACE}.certificates
+        WHERE user_email = ?
+    """,
+    "select_certificates_by_date": f"""
+        SELECT completion_date, certificate_id, course_id, student_name, course_title, certificate_url
+        FROM {KEYSPACE}.certificates
+        WHERE user_email = ? AND completion_date = ?
+    """,
+    "select_course_performance": f"""
+        SELECT user_email, progress_percent, grade
+        FROM {KEYSPACE}.course_performance
+        WHERE course_id = ?
+    """,
+    "select_course_performance_values": f"""
+        SELECT progress_percent, grade
+        FROM {KEYSPACE}.course_performance
+        WHERE course_id = ?
+    """,
+    "select_course_ids": f"""
+        SELECT DISTINCT course_id FROM {KEYSPACE}.course_performance
+    """,
+    "select_login_logs": f"""
+        SELECT last_activity, session_id, start_time, device_info, active_status
+        FROM {KEYSPACE}.login_logs
+        WHERE user_email = ?
+    """,
+    "select_login_logs_by_range": f"""
+        SELECT last_activity, session_id, start_time, device_info, active_status
+        FROM {KEYSPACE}.login_logs
+        WHERE user_email = ? AND last_activity >= ? AND last_activity <= ?
+    """,
+    "select_activities_by_month": f"""
+        SELECT tipo_actividad, timestamp, activity_id, detalles, course_id
+        FROM {KEYSPACE}.student_activity_by_month
+        WHERE user_email = ? AND month = ? AND timestamp >= ? AND timestamp <= ?
+        LIMIT ?
+    """,
+    "select_login_logs_by_month": f"""
+        SELECT last_activity, session_id, start_time, device_info, active_status
+        FROM {KEYSPACE}.login_logs_by_month
+        WHERE user_email = ? AND month = ? AND last_activity >= ? AND last_activity <= ?
+        LIMIT ?
+    """,
+    "select_user_buckets": f"""
+        SELECT month FROM {KEYSPACE}.user_buckets WHERE user_email = ? AND tabla = ?
+    """,
+    "select_user_courses": f"""
+        SELECT course_id FROM {KEYSPACE}.user_courses WHERE user_email = ?
+    """,
+    "select_user_sources": f"""
+        SELECT source FROM {KEYSPACE}.user_sources WHERE user_email = ?
+    """,
+    "select_tasks": f"""
+        SELECT task_id, task_description, due_date, is_completed
+        FROM {KEYSPACE}.task_reminders
+        WHERE user_email = ?
+    """,
+    "select_task_by_id": f"""
+        SELECT task_id, task_description, due_date, is_completed
+        FROM {KEYSPACE}.task_reminders
+        WHERE user_email = ? AND task_id = ?
+    """,
+    "select_course_view_counts": f"""
+        SELECT hour, views
+        FROM {KEYSPACE}.course_view_counts
+        WHERE course_id = ? AND day = ?
+    """,
+    "select_top_instructors": f"""
+        SELECT instructor_email, instructor_name, avg_rating, total_courses
+        FROM {KEYSPACE}.instructor_leaderboard
+        WHERE board = ?
+        LIMIT ?
+    """,
+    "select_load_row_hashes": f"""
+        SELECT user_email, row_key, row_hash, row_data, previous_data FROM {KEYSPACE}.load_row_hashes
+        WHERE source = ? AND bucket = ?
+    """,
+    "select_user_basic_name": f"""
+        SELECT name FROM {KEYSPACE}.user_basic WHERE user_id = ?
+    """,
+
+    # === DELETES (borrado de usuario) ===
+    "delete_instructor_leaderboard": f"DELETE FROM {KEYSPACE}.instructor_leaderboard WHERE board = ?",
+    "delete_student_activity": f"DELETE FROM {KEYSPACE}.student_activity WHERE user_email = ?",
+    "delete_course_progress": f"DELETE FROM {KEYSPACE}.course_progress WHERE user_email = ?",
+    "delete_system_notifications": f"DELETE FROM {KEYSPACE}.system_notifications WHERE user_email = ?",
+    "delete_user_sessions": f"DELETE FROM {KEYSPACE}.user_sessions WHERE user_email = ?",
+    "delete_certificates": f"DELETE FROM {KEYSPACE}.certificates WHERE user_email = ?",
+    "delete_login_logs": f"DELETE FROM {KEYSPACE}.login_logs WHERE user_email = ?",
+    "delete_task_reminders": f"DELETE FROM {KEYSPACE}.task_reminders WHERE user_email = ?",
+    "delete_student_activity_by_month": f"DELETE FROM {KEYSPACE}.student_activity_by_month WHERE user_email = ? AND month = ?",
+    "delete_login_logs_by_month": f"DELETE FROM {KEYSPACE}.login_logs_by_month WHERE user_email = ? AND month = ?",
+    "delete_user_buckets": f"DELETE FROM {KEYSPACE}.user_buckets WHERE user_email = ?",
+    "delete_course_performance": f"DELETE FROM {KEYSPACE}.course_performance WHERE course_id = ? AND user_email = ?",
+    "delete_user_courses": f"DELETE FROM {KEYSPACE}.user_courses WHERE user_email = ?",
+    "delete_user_sources": f"DELETE FROM {KEYSPACE}.user_sources WHERE user_email = ?",
+    "delete_load_row_hashes": f"DELETE FROM {KEYSPACE}.load_row_hashes WHERE user_email = ? AND source = ? AND bucket = ?",
+}
+
+# Copia de particiones al cambiar el email de un usuario: columnas de cada
+# tabla en el mismo orden que su INSERT y la condición que ubica los datos
+# del usuario. Con ellas se generan "migrate_<tabla>" (lee las filas) y
+# "count_<tabla>" (cuenta las filas para verificar la copia).
+MIGRATION_TABLES = {
+    "student_activity": ("user_email, course_id, tipo_actividad, timestamp, activity_id, detalles", "user_email = ?"),
+    "course_progress": ("user_email, course_id, progress_percent, grade", "user_email = ?"),
+    "system_notifications": ("user_email, timestamp, notification_id, course_id, tipo, notificacion", "user_email = ?"),
+    "user_sessions": ("user_email, session_id, device_info, last_activity", "user_email = ?"),
+    "certificates": ("user_email, completion_date, certificate_id, course_id, student_name, course_title, certificate_url", "user_email = ?"),
+    "login_logs": ("user_email, last_activity, session_id, start_time, device_info, active_status", "user_email = ?"),
+    "task_reminders": ("user_email, task_id, task_description, due_date, is_completed", "user_email = ?"),
+    "course_performance": ("user_email, course_id, progress_percent, grade", "course_id = ? AND user_email = ?"),
+    "student_activity_by_month": ("user_email, month, timestamp, activity_id, course_id, tipo_actividad, detalles", "user_email = ? AND month = ?"),
+    "login_logs_by_month": ("user_email, month, last_activity, session_id, start_time, device_info, active_status", "user_email = ? AND month = ?"),
+    "user_buckets": ("user_email, tabla, month", "user_email = ?"),
+    "user_courses": ("user_email, course_id", "user_email = ?"),
+    "user_sources": ("user_email, source", "user_email = ?"),
+    "load_row_hashes": ("user_email, source, bucket, row_key, row_hash, row_data, previous_data",
+                        "user_email = ? AND source = ? AND bucket = ?"),
+}
+for _tabla, (_columns, _where) in MIGRATION_TABLES.items():
+    QUERIES[f"migrate_{_tabla}"] = f"SELECT {_columns} FROM {KEYSPACE}.{_tabla} WHERE {_where}"
+    QUERIES[f"count_{_tabla}"] = f"SELECT COUNT(*) FROM {KEYSPACE}.{_tabla} WHERE {_where}"
+
+# Clave primaria completa de cada tabla que escribe el loader por fila del
+# CSV: columna -> posición en los parámetros de su INSERT. Se generan
+# "delete_row_<tabla>", que borran la fila exacta que escribió ese INSERT
+# (modo incremental, cuando una fila del CSV cambia o desaparece).
+ROW_KEYS = {
+    "student_activity": {"user_email": 0, "timestamp": 3, "activity_id": 4},
+    "course_progress": {"user_email": 0, "course_id": 1},
+    "system_notifications": {"user_email": 0, "timestamp": 1, "notification_id": 2},
+    "user_sessions": {"user_email": 0, "session_id": 1},
+    "certificates": {"user_email": 0, "completion_date": 1, "certificate_id": 2},
+    "course_performance": {"course_id": 1, "user_email": 0},
+    "login_logs": {"user_email": 0, "last_activity": 1, "session_id": 2},
+    "task_reminders": {"user_email": 0, "task_id": 1},
+    "student_activity_by_month": {"user_email": 0, "month": 1, "timestamp": 2, "activity_id": 3},
+    "login_logs_by_month": {"user_email": 0, "month": 1, "last_activity": 2, "session_id": 3},
+    "user_buckets": {"user_email": 0, "tabla": 1, "month": 2},
+    "user_courses": {"user_email": 0, "course_id": 1},
+    "load_row_hashes": {"user_email": 0, "source": 1, "bucket": 2, "row_key": 3},
+}
+for _tabla, _key in ROW_KEYS.items():
+    QUERIES[f"delete_row_{_tabla}"] = f"DELETE FROM {KEYSPACE}.{_tabla} WHERE " + " AND ".join(f"{c} = ?" for c in _key)
+
+# Clave de partición de cada tabla que se puede recorrer completa por rangos
+# de tokens (scanner.py). Se generan "scan_<tabla>" y "scan_count_<tabla>".
+SCAN_TABLES = {
+    "student_activity": "user_email",
+    "course_progress": "user_email",
+    "system_notifications": "user_email",
+    "user_sessions": "user_email",
+    "certificates": "user_email",
+    "course_performance": "course_id",
+    "login_logs": "user_email",
+    "task_reminders": "user_email",
+    "course_view_counts": "course_id, day",
+    "instructor_leaderboard": "board",
+    "student_activity_by_month": "user_email, month",
+    "login_logs_by_month": "user_email, month",
+    "user_buckets": "user_email",
+    "user_courses": "user_email",
+}
+for _tabla, _pk in SCAN_TABLES.items():
+    _range = f"token({_pk}) > ? AND token({_pk}) <= ?"
+    QUERIES[f"scan_{_tabla}"] = f"SELECT * FROM {KEYSPACE}.{_tabla} WHERE {_range}"
+    QUERIES[f"scan_count_{_tabla}"] = f"SELECT COUNT(*) FROM {KEYSPACE}.{_tabla} WHERE {_range}"
+
+# Posición de la clave de partición en los parámetros de cada INSERT del
+# loader; sirve para agrupar filas de la misma partición en un batch.
+# top_instructors no se agrupa porque cada fila es su propia partición.
+# Una tupla indica una clave de partición compuesta.
+PARTITION_KEY_PARAM = {
+    "insert_student_activity": 0,
+    "insert_course_progress": 0,
+    "insert_system_notifications": 0,
+    "insert_user_sessions": 0,
+    "insert_certificates": 0,
+    "insert_login_logs": 0,
+    "insert_task_reminders": 0,
+    "insert_course_performance": 1,
+    "insert_student_activity_by_month": (0, 1),
+    "insert_login_logs_by_month": (0, 1),
+    "insert_user_buckets": 0,
+    "insert_user_courses": 0,
+    "insert_user_sources": 0,
+}
+
+
+def partition_key(name, params):
+    key_param = PARTITION_KEY_PARAM.get(name)
+    if key_param is None:
+        return None
+    if isinstance(key_param, tuple):
+        return tuple(params[i] for i in key_param)
+    return params[key_param]
+
+def table_name(statement_name):
+    # "insert_student_activity" o "delete_row_student_activity" -> "student_activity"
+    if statement_name.startswith("delete_row_"):
+        return statement_name[len("delete_row_"):]
+    return statement_name.split("_", 1)[1]
+
+def row_delete(name, params):
+    # ("insert_<tabla>", parámetros) -> ("delete_row_<tabla>", clave primaria) o None
+    key = ROW_KEYS.get(name[len("insert_"):]) if name.startswith("insert_") else None
+    if key is None:
+        return None
+    return f"delete_row_{name[len('insert_'):]}", tuple(params[i] for i in key.values())
+
+# Sentencias que usa cada punto de entrada, para prepararlas al conectar
+LOADER_STATEMENTS = [name for name in QUERIES if name.startswith("insert_") and name not in ("insert_user_basic", "insert_course_views")]
+LOADER_STATEMENTS += ["update_course_view_counts", "delete_instructor_leaderboard"]
+LOADER_STATEMENTS += [f"delete_row_{tabla}" for tabla in ROW_KEYS]
+MENU_STATEMENTS = [name for name in QUERIES if name.startswith(("select_", "delete_")) and not name.startswith("delete_row_")
+                   and name not in ("select_user_basic_name", "select_load_row_hashes", "delete_instructor_leaderboard")]
+
+# Registro de sentencias preparadas por sesión. Se usan referencias débiles
+# para que al cerrar/descartar la sesión también se liberen sus sentencias.
+_registry = weakref.WeakKeyDictionary()
+
+
+def get_statement(session, name):
+    prepared = _registry.setdefault(session, {})
+    if name not in prepared:
+        statement = session.prepare(QUERIES[name])
+        # Todo salvo los contadores se puede repetir sin efectos extra; esto
+        # habilita la ejecución especulativa del perfil de lectura interactiva
+        statement.is_idempotent = not name.startswith("update_")
+        prepared[name] = statement
+    return prepared[name]
+
+
+def prepare_statements(session, names=None):
+    # Prepara de una vez las sentencias indicadas (o todas) para la sesión
+    names = names if names is not None else list(QUERIES)
+    for name in names:
+        get_statement(session, name)
+    log.info(f"{len(names)} sentencias preparadas para la sesión.")
+    return {name: _registry[session][name] for name in names}
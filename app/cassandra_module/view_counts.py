@@ -0,0 +1,61 @@
+import logging
+from collections import deque
+from datetime import timedelta
+from cassandra_module.cluster import PROFILE_INTERACTIVE_READ
+from cassandra_module.statements import get_statement
+
+log = logging.getLogger(__name__)
+
+# Días que se consultan en paralelo al leer las vistas de un rango
+DEFAULT_DAY_CONCURRENCY = 8
+
+
+class ViewCounter:
+    # Agrega en memoria las vistas de cada curso por día y hora durante un
+    # bloque de la carga (como mucho un bucket por fila del bloque); drain()
+    # entrega los deltas como parámetros de "update_course_view_counts"
+    # (views = views + ?) y reinicia los contadores.
+
+    def __init__(self):
+        self.deltas = {}
+
+    def add(self, course_id, timestamp, views=1):
+        key = (course_id, timestamp.date(), timestamp.hour)
+        self.deltas[key] = self.deltas.get(key, 0) + views
+
+    def drain(self):
+        deltas, self.deltas = self.deltas, {}
+        return [(views, course_id, day, hour) for (course_id, day, hour), views in deltas.items() if views]
+
+
+def days_between(start_day, end_day):
+    days = []
+    day = start_day
+    while day <= end_day:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def fetch_course_views(session, course_id, start_day, end_day, concurrency=DEFAULT_DAY_CONCURRENCY):
+    # Lee los buckets diarios del rango [start_day, end_day] con como mucho
+    # `concurrency` consultas en vuelo: un rango de un año no lanza 365 a la vez.
+    # Devuelve [(día, hora, vistas), ...] en orden cronológico.
+    statement = get_statement(session, "select_course_view_counts")
+    pending = deque()
+    remaining = iter(days_between(start_day, end_day))
+
+    def launch():
+        day = next(remaining, None)
+        if day is not None:
+            pending.append((day, session.execute_async(statement, (course_id, day),
+                                                       execution_profile=PROFILE_INTERACTIVE_READ)))
+
+    for _ in range(concurrency):
+        launch()
+    results = []
+    while pending:
+        day, future = pending.popleft()
+        results.extend((day, row.hour, row.views) for row in future.result())
+        launch()
+    return results
@@ -0,0 +1,286 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import date, datetime
+from cassandra import OperationTimedOut, WriteTimeout
+from cassandra.protocol import OverloadedErrorMessage
+from cassandra.query import BatchStatement, BatchType
+from cassandra_module.cache import invalidate_all
+from cassandra_module.cluster import PROFILE_BULK_WRITE
+from cassandra_module.statements import get_statement, table_name
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 64
+# Máximo de sentencias por batch; batches grandes disparan los warnings de
+# batch_size_warn_threshold en el nodo y no mejoran el rendimiento
+DEFAULT_BATCH_SIZE = 50
+# Reintentos de una escritura rechazada por sobrecarga antes de mandarla al dead-letter
+DEFAULT_MAX_RETRIES = 3
+# Latencia (segundos) a partir de la cual una respuesta cuenta como señal de sobrecarga
+DEFAULT_LATENCY_THRESHOLD = 0.5
+
+# Errores que indican que el clúster está saturado y hay que bajar el ritmo
+OVERLOAD_ERRORS = (WriteTimeout, OverloadedErrorMessage, OperationTimedOut)
+
+
+def _encode(value):
+    if isinstance(value, uuid.UUID):
+        return {"$uuid": str(value)}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decode(obj):
+    if "$uuid" in obj:
+        return uuid.UUID(obj["$uuid"])
+    if "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    if "$date" in obj:
+        return date.fromisoformat(obj["$date"])
+    return obj
+
+
+class DeadLetterFile:
+    # Archivo JSONL con las escrituras que fallaron definitivamente: nombre de
+    # la sentencia del registro, parámetros tipados y error. Se puede
+    # reprocesar con replay_dead_letters(). Las escrituras no idempotentes
+    # (contadores) que vencieron por timeout se marcan "maybe_applied": el
+    # servidor pudo haberlas aplicado y reenviarlas las duplicaría.
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def write(self, name, params, error, maybe_applied=False):
+        line = json.dumps({"statement": name, "params": list(params), "error": str(error),
+                           "maybe_applied": maybe_applied}, default=_encode)
+        with self._lock:
+            # Una sola escritura por línea para que varios procesos puedan anexar
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+            self.count += 1
+
+
+def read_dead_letters(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line, object_hook=_decode)
+                yield entry["statement"], tuple(entry["params"]), entry.get("maybe_applied", False)
+
+
+class AsyncWriter:
+    # Pipeline de escrituras con execute_async y una cola por tabla que se
+    # atiende en round-robin, para que ninguna tabla acapare la ventana.
+    # La ventana de peticiones en vuelo se ajusta AIMD: crece de a una por
+    # ventana completada sin problemas y se reduce a la mitad ante timeouts,
+    # Overloaded o latencias por encima del umbral. Sólo se reintentan las
+    # sentencias idempotentes; las demás y las que siguen fallando van al
+    # dead-letter en lugar de perderse.
+
+    def __init__(self, session, concurrency=DEFAULT_CONCURRENCY, max_queued=None, dead_letter=None,
+                 max_retries=DEFAULT_MAX_RETRIES, latency_threshold=DEFAULT_LATENCY_THRESHOLD, min_concurrency=1,
+                 execution_profile=PROFILE_BULK_WRITE):
+        self.session = session
+        self.execution_profile = execution_profile
+        self.max_concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.window = float(concurrency)
+        # Límite de elementos encolados antes de bloquear al productor
+        self.max_queued = max_queued or concurrency * 4
+        self.dead_letter = dead_letter
+        self.max_retries = max_retries
+        self.latency_threshold = latency_threshold
+        self.queues = {}
+        self.stats = {}
+        self._order = deque()
+        self._queued = 0
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    def submit(self, table, statement, params=None, rows=1, items=None):
+        # `rows` es cuántas filas representa la petición (más de una si es un batch)
+        # `items` son los (nombre, parámetros) que irían al dead-letter si falla
+        with self._cond:
+            while self._queued >= self.max_queued:
+                self._cond.wait()
+            if table not in self.queues:
+                self.queues[table] = deque()
+                self._order.append(table)
+            self.stats.setdefault(table, {"ok": 0, "error": 0})
+            self.queues[table].append((statement, params, rows, items or [], 0))
+            self._queued += 1
+        self._pump()
+
+    def _next_item(self):
+        # Siguiente escritura en round-robin entre las colas no vacías
+        for _ in range(len(self._order)):
+            table = self._order[0]
+            self._order.rotate(-1)
+            if self.queues[table]:
+                return table, self.queues[table].popleft()
+        return None
+
+    def _pump(self):
+        while True:
+            with self._cond:
+                if self._in_flight >= int(self.window):
+                    return
+                item = self._next_item()
+                if item is None:
+                    return
+                self._queued -= 1
+                self._in_flight += 1
+                self._cond.notify_all()
+            table, request = item
+            statement, params = request[0], request[1]
+            started = time.monotonic()
+            try:
+                future = self.session.execute_async(statement, params, execution_profile=self.execution_profile)
+            except Exception as e:
+                self._on_error(e, table, request, started)
+                continue
+            future.add_callbacks(self._on_success, self._on_error,
+                                 callback_args=(table, request, started), errback_args=(table, request, started))
+
+    def _decrease(self, reason):
+        # Reducción multiplicativa, como mucho una vez por umbral de latencia
+        # para que una sola ráfaga de errores no colapse la ventana
+        now = time.monotonic()
+        if now - self._last_decrease < self.latency_threshold:
+            return
+        self._last_decrease = now
+        self.window = max(float(self.min_concurrency), self.window / 2)
+        log.warning(f"Cassandra sobrecargado ({reason}); ventana reducida a {int(self.window)}.")
+
+    def _on_success(self, _result, table, request, started):
+        latency = time.monotonic() - started
+        with self._cond:
+            self._in_flight -= 1
+            self.stats[table]["ok"] += request[2]
+            if latency > self.latency_threshold:
+                self._decrease(f"latencia de {latency:.2f}s")
+            elif self.window < self.max_concurrency:
+                # Incremento aditivo: +1 por cada ventana completa de respuestas
+                self.window = min(float(self.max_concurrency), self.window + 1 / self.window)
+            self._cond.notify_all()
+        self._pump()
+
+    def _on_error(self, error, table, request, started):
+        statement, params, rows, items, attempts = request
+        overloaded = isinstance(error, OVERLOAD_ERRORS)
+        # Un timeout no dice si la escritura se aplicó: reenviar un delta de
+        # contador lo sumaría dos veces
+        idempotent = getattr(statement, "is_idempotent", False)
+        retry = overloaded and idempotent and attempts < self.max_retries
+        if not retry:
+            # Se registra antes de liberar el lugar en vuelo para que drain()
+            # no regrese con escrituras del dead-letter aún pendientes
+            log.error(f"Error al escribir en {table}: {error}")
+            if self.dead_letter:
+                for name, item_params in items:
+                    self.dead_letter.write(name, item_params, error, maybe_applied=overloaded and not idempotent)
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease(type(error).__name__)
+            if retry:
+                # Se reintenta al final de su cola con la ventana ya reducida
+                self.queues[table].append((statement, params, rows, items, attempts + 1))
+                self._queued += 1
+            else:
+                self.stats[table]["error"] += rows
+            self._cond.notify_all()
+        self._pump()
+
+    def drain(self):
+        # Espera a que se vacíen las colas y terminen todas las peticiones;
+        # devuelve las estadísticas acumuladas desde el último drain
+        self._pump()
+        with self._cond:
+            while self._queued or self._in_flight:
+                self._cond.wait()
+            stats, self.stats = self.stats, {}
+        return stats
+
+    def report(self):
+        with self._cond:
+            return {table: dict(counts) for table, counts in self.stats.items()}
+
+
+class PartitionBatcher:
+    # Agrupa las escrituras por (tabla, clave de partición) y las envía como
+    # batches UNLOGGED de una sola partición a través de un AsyncWriter.
+    # Así el coordinador recibe una petición por partición en vez de una por fila.
+
+    def __init__(self, writer, batch_size=DEFAULT_BATCH_SIZE, max_buffered=None):
+        self.writer = writer
+        self.batch_size = batch_size
+        # Sentencias retenidas en memoria antes de forzar un flush completo
+        self.max_buffered = max_buffered or batch_size * 200
+        self.groups = {}
+        self._buffered = 0
+
+    def add(self, table, partition_key, name, statement, params):
+        if partition_key is None:
+            self.writer.submit(table, statement, params, items=[(name, params)])
+            return
+        group = self.groups.setdefault((table, partition_key), [])
+        group.append((name, statement, params))
+        self._buffered += 1
+        if len(group) >= self.batch_size:
+            self._send(table, partition_key)
+        elif self._buffered >= self.max_buffered:
+            self.flush()
+
+    def _send(self, table, partition_key):
+        group = self.groups.pop((table, partition_key))
+        self._buffered -= len(group)
+        items = [(name, params) for name, _, params in group]
+        if len(group) == 1:
+            _, statement, params = group[0]
+            self.writer.submit(table, statement, params, items=items)
+            return
+        batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for _, statement, params in group:
+            batch.add(statement, params)
+        # El batch se puede reintentar sólo si todas sus sentencias se pueden
+        batch.is_idempotent = all(getattr(statement, "is_idempotent", False) for _, statement, _ in group)
+        self.writer.submit(table, batch, rows=len(group), items=items)
+
+    def flush(self):
+        for table, partition_key in list(self.groups):
+            self._send(table, partition_key)
+
+
+def replay_dead_letters(session, path, concurrency=DEFAULT_CONCURRENCY, dead_letter_path=None):
+    # Reenvía las escrituras de un archivo dead-letter; las que vuelvan a
+    # fallar quedan en `dead_letter_path` (por defecto `<path>.retry`). Las
+    # marcadas "maybe_applied" no se reenvían: se cuentan como omitidas.
+    writer = AsyncWriter(session, concurrency, dead_letter=DeadLetterFile(dead_letter_path or f"{path}.retry"))
+    omitidas = 0
+    for name, params, maybe_applied in read_dead_letters(path):
+        if maybe_applied:
+            omitidas += 1
+            continue
+        writer.submit(table_name(name), get_statement(session, name), params, items=[(name, params)])
+    stats = writer.drain()
+    if omitidas:
+        log.warning(f"{omitidas} escrituras no idempotentes que pudieron haberse aplicado no se reenviaron.")
+    invalidate_all()
+    return stats
+
+
+def print_report(stats):
+    print("Resultado por tabla:")
+    for table, counts in sorted(stats.items()):
+        print(f"  {table}: {counts['ok']} correctas, {counts['error']} con error")
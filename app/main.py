@@ -2,9 +2,9 @@ import sys
 import json
 import pydgraph
 from pymongo import MongoClient
-from cassandra.cluster import Cluster
-from cassandra.policies import RoundRobinPolicy
+from cassandra_module.cluster import PROFILE_INTERACTIVE_READ, get_session
 from cassandra_module.loader import load_cassandra_data
+from cassandra_module.statements import get_statement
 from mongo_module.loader import load_mongo_data
 from dgraph_module.loader import load_dgraph_data
 from shared.sync import sync_users_across_dbs
@@ -48,13 +48,9 @@ def consultar_usuario():
 
     # Cassandra
     try:
-        cluster = Cluster(
-            contact_points=["127.0.0.1"],
-            load_balancing_policy=RoundRobinPolicy(),
-            protocol_version=5
-        )
-        session = cluster.connect("plataforma_online")
-        row = session.execute("SELECT name FROM user_basic WHERE user_id = %s", [user_id]).one()
+        session = get_session()
+        row = session.execute(get_statement(session, "select_user_basic_name"), [user_id],
+                              execution_profile=PROFILE_INTERACTIVE_READ).one()
         if row:
             nombre_cassandra = row.name
     except Exception as e:
@@ -0,0 +1,82 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+log = logging.getLogger(__name__)
+
+# Plan de índices de cada colección, declarado una sola vez. Cubre las
+# búsquedas y los $lookup de resources.py:
+#   usuarios.user_id      -> $lookup de perfil/inscripciones y consultas por alumno
+#   cursos.course_id      -> $lookup de cursos_inscritos_por_usuario
+#   cursos.teacher_id     -> $lookup de perfil_profesor_con_cursos
+#   lecciones.comments.user_id -> comentarios_por_usuario
+INDEX_PLAN = {
+    "usuarios": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_1"),
+        IndexModel([("email", ASCENDING)], name="email_1"),
+        IndexModel([("name", ASCENDING)], name="name_1"),
+    ],
+    "cursos": [
+        IndexModel([("course_id", ASCENDING)], name="course_id_1"),
+        IndexModel([("teacher_id", ASCENDING)], name="teacher_id_1"),
+        IndexModel([("title", TEXT)], name="title_text"),
+        IndexModel([("category", ASCENDING), ("rating", DESCENDING)], name="category_1_rating_-1"),
+    ],
+    "lecciones": [
+        IndexModel([("course_id", ASCENDING)], name="course_id_1"),
+        IndexModel([("comments.user_id", ASCENDING)], name="comments.user_id_1"),
+    ],
+    "instructores": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_1"),
+        IndexModel([("name", ASCENDING)], name="name_1"),
+        IndexModel([("email", ASCENDING)], name="email_1"),
+    ],
+}
+
+
+def build_indexes(db, plan=INDEX_PLAN):
+    # Un solo create_indexes por colección (el servidor construye todos sus
+    # índices en una pasada) y las colecciones en paralelo. Se llama después
+    # de cargar los datos, no antes, para no mantener índices fila por fila.
+    with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+        futures = {name: pool.submit(db[name].create_indexes, models) for name, models in plan.items()}
+        created = {name: future.result() for name, future in futures.items()}
+    log.info(f"Índices construidos: {created}")
+    return created
+
+
+def _keys(spec):
+    # Los índices de texto se guardan como _fts/_ftsx; se comparan por nombre
+    keys = list(spec.items()) if hasattr(spec, "items") else list(spec)
+    return None if any(value == TEXT or field == "_fts" for field, value in keys) else keys
+
+
+def check_index_drift(db, plan=INDEX_PLAN):
+    # Compara los índices existentes con el plan. Devuelve
+    # {colección: {"faltantes": [...], "distintos": [...], "sobrantes": [...]}}
+    # sólo para las colecciones con diferencias.
+    drift = {}
+    for name, models in plan.items():
+        existing = {index: _keys(info["key"]) for index, info in db[name].index_information().items() if index != "_id_"}
+        expected = {model.document["name"]: _keys(model.document["key"]) for model in models}
+        faltantes = [index for index in expected if index not in existing]
+        distintos = [index for index in expected if index in existing and existing[index] != expected[index]]
+        sobrantes = [index for index in existing if index not in expected]
+        if faltantes or distintos or sobrantes:
+            drift[name] = {"faltantes": faltantes, "distintos": distintos, "sobrantes": sobrantes}
+    return drift
+
+
+def ensure_indexes(db, plan=INDEX_PLAN):
+    # Chequeo al iniciar: crea los índices faltantes y avisa de los que no
+    # coinciden con el plan (esos se deben corregir a mano)
+    drift = check_index_drift(db, plan)
+    faltantes = {name: [model for model in plan[name] if model.document["name"] in diff["faltantes"]]
+                 for name, diff in drift.items() if diff["faltantes"]}
+    if faltantes:
+        build_indexes(db, faltantes)
+    for name, diff in drift.items():
+        if diff["distintos"] or diff["sobrantes"]:
+            log.warning(f"Índices de {name} fuera del plan: {diff}")
+            print(f"Aviso: los índices de {name} no coinciden con el plan ({diff})")
+    return drift
@@ -1,7 +1,20 @@
 import os
 import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
 from datetime import datetime
+from mongo_module.indexes import INDEX_PLAN, build_indexes
+
+# Documentos por insert_many en el modo "stream"
+DEFAULT_CHUNK_SIZE = 1000
+
+# Write concern de la carga masiva: confirmación del primario sin esperar el
+# journal; la carga se puede repetir completa si algo falla
+BULK_WRITE_CONCERN = WriteConcern(w=1, j=False)
 
 
 def connect_to_mongo():
@@ -14,94 +27,168 @@ def load_csv_data(filepath):
         return list(csv.DictReader(f))
 
 
-def load_mongo_data(csv_dir):
-    db = connect_to_mongo()
+def iter_csv_data(filepath):
+    # Igual que load_csv_data pero fila por fila, sin cargar el archivo en memoria
+    with open(filepath, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def parse_fecha(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
 
-    # Limpiar colecciones existentes
-    db.usuarios.drop()
-    db.cursos.drop()
-    db.lecciones.drop()
-    db.instructores.drop()
-
-    # === USUARIOS ===
-    usuarios_data = load_csv_data(os.path.join(csv_dir, "usuariosM.csv"))
-    usuarios = []
-    for row in usuarios_data:
-        doc = {
-            "user_id": row["user_id"],
-            "name": row["name"],
-            "email": row["email"],
-            "password": row["password"],
-            "courses_enrolled": [row["courses_enrolled"]] if row["courses_enrolled"] else [],
-            "courses_completed": [],
-            "created_at": datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
-        }
-        if row["completed_course_id"]:
-            doc["courses_completed"].append({
-                "course_id": row["completed_course_id"],
-                "score": float(row["score"])
-            })
-        usuarios.append(doc)
-    db.usuarios.insert_many(usuarios)
-    db.usuarios.create_index({"email": 1})
-    db.usuarios.create_index({"name": 1})
-
-
-    # === CURSOS ===
-    cursos_data = load_csv_data(os.path.join(csv_dir, "cursosM.csv"))
-    cursos = []
-    for row in cursos_data:
-        cursos.append({
-            "course_id": row["course_id"],
-            "title": row["title"],
-            "description": row["description"],
-            "teacher_id": row["teacher_id"],
-            "lessons": row["lessons"].split(";") if row["lessons"] else [],
-            "created_at": datetime.fromisoformat(row["created_at"].replace("Z", "+00:00")),
-            "rating": float(row["rating"]),
-            "category": row["category"]
+# === USUARIOS ===
+def build_usuario(row):
+    doc = {
+        "user_id": row["user_id"],
+        "name": row["name"],
+        "email": row["email"],
+        "password": row["password"],
+        "courses_enrolled": [row["courses_enrolled"]] if row["courses_enrolled"] else [],
+        "courses_completed": [],
+        "created_at": parse_fecha(row["created_at"])
+    }
+    if row["completed_course_id"]:
+        doc["courses_completed"].append({
+            "course_id": row["completed_course_id"],
+            "score": float(row["score"])
         })
-    db.cursos.insert_many(cursos)
-    db.cursos.create_index([("title", "text")])
-
-    # === LECCIONES ===
-    lecciones_data = load_csv_data(os.path.join(csv_dir, "leccionesM.csv"))
-    lecciones = []
-    for row in lecciones_data:
-        doc = {
-            "lesson_id": row["lesson_id"],
-            "course_id": row["course_id"],
-            "title": row["title"],
-            "content": row["content"],
-            "duration": int(row["duration"]),
-            "resources": [row["resource"]] if row["resource"] else [],
-            "comments": []
-        }
-        if row["comment_user_id"]:
-            doc["comments"].append({
-                "user_id": row["comment_user_id"],
-                "comment": row["comment"],
-                "timestamp": datetime.fromisoformat(row["timestamp"].replace("Z", "+00:00"))
-            })
-        lecciones.append(doc)
-    db.lecciones.insert_many(lecciones)
-    db.lecciones.create_index({"course_id": 1})
-
-
-    # === INSTRUCTORES ===
-    instructores_data = load_csv_data(os.path.join(csv_dir, "instructoresM.csv"))
-    instructores = []
-    for row in instructores_data:
-        instructores.append({
-            "user_id": row["user_id"],
-            "name": row["name"],
-            "email": row["email"],
-            "password": row["password"],
-            "courses_list": row["courses_list"].split(";") if row["courses_list"] else [],
-            "created_at": datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
+    return doc
+
+
+# === CURSOS ===
+def build_curso(row):
+    return {
+        "course_id": row["course_id"],
+        "title": row["title"],
+        "description": row["description"],
+        "teacher_id": row["teacher_id"],
+        "lessons": row["lessons"].split(";") if row["lessons"] else [],
+        "created_at": parse_fecha(row["created_at"]),
+        "rating": float(row["rating"]),
+        "category": row["category"]
+    }
+
+
+# === LECCIONES ===
+def build_leccion(row):
+    doc = {
+        "lesson_id": row["lesson_id"],
+        "course_id": row["course_id"],
+        "title": row["title"],
+        "content": row["content"],
+        "duration": int(row["duration"]),
+        "resources": [row["resource"]] if row["resource"] else [],
+        "comments": []
+    }
+    if row["comment_user_id"]:
+        doc["comments"].append({
+            "user_id": row["comment_user_id"],
+            "comment": row["comment"],
+            "timestamp": parse_fecha(row["timestamp"])
         })
-    db.instructores.insert_many(instructores)
-    db.instructores.create_index({"name": 1})
-    db.instructores.create_index({"email": 1})
+    return doc
+
+
+# === INSTRUCTORES ===
+def build_instructor(row):
+    return {
+        "user_id": row["user_id"],
+        "name": row["name"],
+        "email": row["email"],
+        "password": row["password"],
+        "courses_list": row["courses_list"].split(";") if row["courses_list"] else [],
+        "created_at": parse_fecha(row["created_at"])
+    }
+
+
+# Colección -> (archivo CSV, constructor del documento)
+COLLECTIONS = {
+    "usuarios": ("usuariosM.csv", build_usuario),
+    "cursos": ("cursosM.csv", build_curso),
+    "lecciones": ("leccionesM.csv", build_leccion),
+    "instructores": ("instructoresM.csv", build_instructor),
+}
+
+
+def stream_collection(db, name, filepath, build, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Lee el CSV de a una fila y envía bloques de `chunk_size` documentos con
+    # insert_many(ordered=False): el servidor no se detiene en el primer error
+    # y la memoria queda acotada a un bloque. Devuelve las estadísticas.
+    collection = db.get_collection(name, write_concern=BULK_WRITE_CONCERN)
+    docs = (build(row) for row in iter_csv_data(filepath))
+    stats = {"insertados": 0, "errores": 0}
+    start = time.monotonic()
+    while True:
+        chunk = list(islice(docs, chunk_size))
+        if not chunk:
+            break
+        try:
+            stats["insertados"] += len(collection.insert_many(chunk, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            stats["insertados"] += e.details.get("nInserted", 0)
+            stats["errores"] += len(e.details.get("writeErrors", []))
+    stats["segundos"] = time.monotonic() - start
+    stats["docs_por_segundo"] = stats["insertados"] / stats["segundos"] if stats["segundos"] else 0.0
+    return stats
+
+
+def print_throughput(all_stats):
+    print("Resultado por colección:")
+    for name, stats in all_stats.items():
+        print(f"  {name}: {stats['insertados']} documentos en {stats['segundos']:.2f}s "
+              f"({stats['docs_por_segundo']:.0f} docs/s), {stats['errores']} con error")
+
+
+def swap_staging(db, counts):
+    # Verifica que cada colección *_staging tenga tantos documentos como filas
+    # se leyeron y sólo entonces la renombra sobre la de producción
+    # (renameCollection con dropTarget=True, atómico por colección). Si alguna
+    # no cuadra no se toca ninguna y las de staging quedan para revisarlas.
+    for name, expected in counts.items():
+        found = db[f"{name}_staging"].count_documents({})
+        if found != expected:
+            print(f"Error: {name}_staging tiene {found} documentos y se esperaban {expected}; no se reemplazan los datos.")
+            return False
+    for name in counts:
+        db[f"{name}_staging"].rename(name, dropTarget=True)
+    return True
+
+
+def load_mongo_data(csv_dir, mode="memory", chunk_size=DEFAULT_CHUNK_SIZE, staging=False):
+    # mode="memory": lee cada CSV completo y hace un insert_many ordenado (comportamiento original)
+    # mode="stream": lee los CSV de forma perezosa, inserta en bloques sin orden
+    #                y carga las cuatro colecciones en paralelo
+    # staging=True: recarga sin dejar la aplicación sin datos. Se carga en
+    #               colecciones <nombre>_staging, se construyen ahí los índices,
+    #               se validan los conteos y recién entonces se reemplazan las
+    #               de producción, que siguen sirviendo lecturas hasta el cambio
+    db = connect_to_mongo()
+    suffix = "_staging" if staging else ""
+
+    # Limpiar colecciones existentes (con staging, sólo restos de una recarga anterior)
+    for name in COLLECTIONS:
+        db[f"{name}{suffix}"].drop()
+
+    counts = {}
+    if mode == "stream":
+        with ThreadPoolExecutor(max_workers=len(COLLECTIONS)) as pool:
+            futures = {name: pool.submit(stream_collection, db, f"{name}{suffix}", os.path.join(csv_dir, filename), build, chunk_size)
+                       for name, (filename, build) in COLLECTIONS.items()}
+            all_stats = {name: future.result() for name, future in futures.items()}
+        print_throughput(all_stats)
+        counts = {name: stats["insertados"] + stats["errores"] for name, stats in all_stats.items()}
+    else:
+        for name, (filename, build) in COLLECTIONS.items():
+            docs = [build(row) for row in load_csv_data(os.path.join(csv_dir, filename))]
+            db[f"{name}{suffix}"].insert_many(docs)
+            counts[name] = len(docs)
+
+    # Índices al final (plan de indexes.py): construirlos una vez es más
+    # barato que mantenerlos en cada inserción
+    build_indexes(db, {f"{name}{suffix}": models for name, models in INDEX_PLAN.items()})
+
+    if staging and not swap_staging(db, counts):
+        return
 
     print("Datos de MongoDB cargados correctamente.")
@@ -11,10 +11,13 @@ from mongo_module.resources import (
     comentarios_por_usuario,
     total_cursos_completados,
 )
+from mongo_module.indexes import ensure_indexes
 from datetime import datetime
 
 
 def menu_consultas_mongo(db):
+    # Verificar al iniciar que los índices que usan las consultas existan
+    ensure_indexes(db)
     while True:
         print("\n=== CONSULTAS MONGODB ===")
         print("1. Crear usuario")
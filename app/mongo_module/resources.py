@@ -163,6 +163,8 @@ def comentarios_por_usuario(db, nombre_usuario):
         return None, []
 
     pipeline = [
+        # Filtrar antes del $unwind para usar el índice comments.user_id
+        { "$match": { "comments.user_id": user["user_id"] } },
         { "$unwind": "$comments" },
         { "$match": { "comments.user_id": user["user_id"] } },
         {
@@ -1,6 +1,6 @@
 from pymongo import MongoClient
-from cassandra.cluster import Cluster
-from cassandra.policies import RoundRobinPolicy 
+from cassandra_module.cluster import KEYSPACE, PROFILE_BULK_WRITE, get_session
+from cassandra_module.statements import get_statement
 import pydgraph
 from datetime import datetime
 
@@ -15,15 +15,10 @@ def get_mongo_users():
 
 # === CASSANDRA ===
 def insert_users_to_cassandra(users):
-    cluster = Cluster(
-        contact_points=["127.0.0.1"],
-        load_balancing_policy=RoundRobinPolicy(),
-        protocol_version=5
-    )
-    session = cluster.connect("plataforma_online")
+    session = get_session()
 
-    session.execute("""
-        CREATE TABLE IF NOT EXISTS user_basic (
+    session.execute(f"""
+        CREATE TABLE IF NOT EXISTS {KEYSPACE}.user_basic (
             user_id text PRIMARY KEY,
             email text,
             name text,
@@ -31,11 +26,13 @@ def insert_users_to_cassandra(users):
         );
     """)
 
+    insert_user = get_statement(session, "insert_user_basic")
     for user in users:
         try:
             session.execute(
-                "INSERT INTO user_basic (user_id, email, name, inserted_at) VALUES (%s, %s, %s, %s)",
-                (user["user_id"], user["email"], user["name"], datetime.utcnow())
+                insert_user,
+                (user["user_id"], user["email"], user["name"], datetime.utcnow()),
+                execution_profile=PROFILE_BULK_WRITE
             )
         except Exception as e:
             print(f"Error insertando en Cassandra: {e}")
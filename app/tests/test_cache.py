@@ -0,0 +1,31 @@
+from cassandra_module.cache import TTLCache
+
+
+def test_evicts_least_recently_used_entries_past_the_row_budget():
+    cache = TTLCache(max_entries=10, max_rows=5)
+    cache.put(("course_performance", "a"), [1, 2])
+    cache.put(("course_performance", "b"), [1, 2])
+    cache.get(("course_performance", "a"))
+    cache.put(("course_performance", "c"), [1, 2])
+    assert cache.get(("course_performance", "b")) == (False, None)
+    assert cache.get(("course_performance", "a")) == (True, [1, 2])
+    assert cache.stats()["rows"] == 4
+
+
+def test_results_larger_than_the_row_budget_are_not_cached():
+    cache = TTLCache(max_rows=3)
+    cache.put(("course_performance", "a"), [1])
+    assert cache.get_or_load(("course_performance", "a"), lambda: list(range(10))) == [1]
+    cache.put(("course_performance", "a"), list(range(10)))
+    assert cache.get(("course_performance", "a")) == (False, None)
+    assert cache.stats()["rows"] == 0
+
+
+def test_invalidate_and_clear_release_their_rows():
+    cache = TTLCache()
+    cache.put(("course_progress", "a@x.com", None), [1, 2, 3])
+    cache.put(("course_performance", "Redes"), [1])
+    assert cache.invalidate(lambda key: key[0] == "course_progress") == 1
+    assert cache.stats()["rows"] == 1
+    cache.clear()
+    assert cache.stats()["rows"] == 0
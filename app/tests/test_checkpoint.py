@@ -0,0 +1,78 @@
+import json
+from cassandra_module.checkpoint import CheckpointJournal
+from cassandra_module.sharding import iter_lines, split_shards
+
+HEADER = "user_email,course_id,tipo_actividad,timestamp,activity_id\n"
+
+
+def write_csv(path, rows):
+    # Filas de largo distinto para que los límites de los shards caigan a mitad de línea
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER)
+        for i in range(rows):
+            f.write(f"alumno{i}@mail.com,C{i % 7},{'x' * (i % 13)},2024-01-01T00:00:00,{i}\n")
+    return str(path)
+
+
+def test_split_shards_starts_on_line_boundaries(tmp_path):
+    csv_path = write_csv(tmp_path / "datos.csv", 101)
+    data = open(csv_path, 'rb').read()
+    line_starts = {i + 1 for i, byte in enumerate(data) if byte == ord("\n")}
+    for workers in (1, 2, 3, 7, 16):
+        shards = split_shards(csv_path, workers)
+        assert shards[0][0] == len(HEADER)
+        assert shards[-1][1] == len(data)
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            assert end == start
+            assert start in line_starts
+        # Cada fila sale en exactamente un shard
+        lines = [line for start, end in shards for _, line in iter_lines(csv_path, start, end)]
+        assert len(lines) == 101
+        assert "".join(lines) == data[len(HEADER):].decode('utf-8')
+
+
+def test_split_shards_more_workers_than_lines(tmp_path):
+    csv_path = write_csv(tmp_path / "datos.csv", 2)
+    shards = split_shards(csv_path, 10)
+    assert len(shards) == 2
+    assert all(start < end for start, end in shards)
+
+
+def test_journal_keeps_largest_offset_per_shard(tmp_path):
+    csv_path = write_csv(tmp_path / "datos.csv", 50)
+    shards = split_shards(csv_path, 2)
+    journal = CheckpointJournal(str(tmp_path / "datos.checkpoint"))
+    journal.start(csv_path, shards)
+    first, second = shards
+    journal.record(first, first[0] + 100, {"a": 1})
+    journal.record(second, second[0] + 50, {"b": 1})
+    # Los workers anexan en cualquier orden: un offset menor posterior no retrocede
+    journal.record(first, first[0] + 300, {"a": 3})
+    journal.record(first, first[0] + 200, {"a": 2})
+
+    loaded_shards, offsets, states = journal.load(csv_path)
+    assert loaded_shards == shards
+    assert offsets == {first: first[0] + 300, second: second[0] + 50}
+    assert states == {first: {"a": 3}, second: {"b": 1}}
+
+
+def test_journal_ignores_truncated_last_line(tmp_path):
+    csv_path = write_csv(tmp_path / "datos.csv", 20)
+    shards = split_shards(csv_path, 1)
+    journal = CheckpointJournal(str(tmp_path / "datos.checkpoint"))
+    journal.start(csv_path, shards)
+    journal.record(shards[0], shards[0][0] + 40)
+    # El proceso murió a mitad del registro siguiente
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"shard": list(shards[0]), "offset": shards[0][0] + 80})[:-7])
+
+    _, offsets, _ = journal.load(csv_path)
+    assert offsets == {shards[0]: shards[0][0] + 40}
+
+
+def test_journal_rejects_a_different_file(tmp_path):
+    csv_path = write_csv(tmp_path / "datos.csv", 20)
+    journal = CheckpointJournal(str(tmp_path / "datos.checkpoint"))
+    journal.start(csv_path, split_shards(csv_path, 1))
+    write_csv(csv_path, 21)
+    assert journal.load(csv_path) is None
@@ -0,0 +1,210 @@
+import csv
+import re
+import threading
+from collections import namedtuple
+from cassandra import WriteTimeout, WriteType
+from cassandra_module import loader
+from cassandra_module.loader import write_sync
+from cassandra_module.statements import ROW_KEYS, table_name
+from cassandra_module.writer import DeadLetterFile, read_dead_letters
+
+
+class FailingSession:
+    # Prepara cualquier sentencia y falla en cada execute con `error`
+
+    def __init__(self, error):
+        self.error = error
+
+    def prepare(self, query):
+        return type("Prepared", (), {"query": query})()
+
+    def execute(self, statement, params=None, execution_profile=None):
+        raise self.error
+
+
+def test_table_name_maps_row_deletes_to_their_table():
+    assert table_name("insert_student_activity") == "student_activity"
+    assert table_name("delete_row_student_activity") == "student_activity"
+    assert table_name("delete_load_row_hashes") == "load_row_hashes"
+
+
+def test_write_sync_reports_failed_deletes(tmp_path):
+    session = FailingSession(WriteTimeout("timeout", write_type=WriteType.SIMPLE))
+    dead_letter = DeadLetterFile(str(tmp_path / "dead.jsonl"))
+    stats = {}
+    params = ("a@x.com", "2024-01-01", "id")
+    write_sync(session, "delete_row_student_activity", params, stats, dead_letter)
+    assert stats == {"student_activity": {"ok": 0, "error": 1}}
+    assert list(read_dead_letters(dead_letter.path)) == [("delete_row_student_activity", params, False)]
+
+
+# === Carga incremental contra una sesión en memoria ===
+
+# Clave primaria de cada tabla que escribe la carga incremental
+TABLE_KEYS = dict(ROW_KEYS, user_sources={"user_email": 0, "source": 1},
+                  course_view_counts={"course_id": 0, "day": 1, "hour": 2})
+
+HEADER = ["user_email", "course_id", "tipo_actividad", "timestamp", "activity_id", "detalles", "progress_percent",
+          "grade", "device_info", "teacher_name", "teacher_email", "teacher_avg"]
+
+A1 = "c8623068-9601-5119-8eb8-a7bfde9c6908"
+A2 = "0c1dce95-7c88-5004-9ca8-6d007d111952"
+A3 = "5b0a5d7e-3f4c-4d55-9a43-2f9f1d6b3c11"
+
+
+class Prepared:
+
+    def __init__(self, query):
+        self.query = " ".join(query.split())
+
+
+class ImmediateFuture:
+
+    def __init__(self, rows=None, error=None):
+        self.rows = rows
+        self.error = error
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.rows
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        if self.error is None:
+            threading.Timer(0, callback, (self.rows,) + tuple(callback_args)).start()
+        else:
+            threading.Timer(0, errback, (self.error,) + tuple(errback_args)).start()
+
+
+class MemorySession:
+    # Interpreta las sentencias del loader sobre {tabla: {clave primaria: fila}}.
+    # Los DELETE sobre `failing_table` fallan, para simular un nodo caído.
+
+    def __init__(self, tables, failing_table=None):
+        self.tables = tables
+        self.failing_table = failing_table
+        self.cluster = self
+
+    def shutdown(self):
+        pass
+
+    def prepare(self, query):
+        return Prepared(query)
+
+    def execute_async(self, statement, params=None, execution_profile=None):
+        try:
+            return ImmediateFuture(self.execute(statement, params))
+        except Exception as e:
+            return ImmediateFuture(error=e)
+
+    def execute(self, statement, params=None, execution_profile=None):
+        query = getattr(statement, "query", None) or " ".join(statement.query_string.split())
+        params = tuple(params or ())
+        if query.startswith("CREATE"):
+            return []
+        match = re.match(r"INSERT INTO \w+\.(\w+) \((.*?)\) VALUES", query)
+        if match:
+            table = match.group(1)
+            row = dict(zip((column.strip() for column in match.group(2).split(",")), params))
+            self.tables.setdefault(table, {})[tuple(row[column] for column in TABLE_KEYS[table])] = row
+            return []
+        if query.startswith("UPDATE"):
+            views, course_id, day, hour = params
+            row = self.tables.setdefault("course_view_counts", {}).setdefault(
+                (course_id, day, hour), {"course_id": course_id, "day": day, "hour": hour, "views": 0})
+            row["views"] += views
+            return []
+        match = re.match(r"(?:SELECT (.*?) FROM|DELETE FROM) \w+\.(\w+) WHERE (.*)", query)
+        table = match.group(2)
+        where = dict(zip(re.findall(r"(\w+) = \?", match.group(3)), params))
+        keys = [key for key, row in self.tables.get(table, {}).items()
+                if all(row[column] == value for column, value in where.items())]
+        if query.startswith("DELETE"):
+            if table == self.failing_table:
+                raise Exception(f"{table} no disponible")
+            for key in keys:
+                del self.tables[table][key]
+            return []
+        Row = namedtuple("Row", [column.strip() for column in match.group(1).split(",")])
+        return [Row(*(self.tables[table][key].get(column) for column in Row._fields)) for key in keys]
+
+
+def activity(activity_id, timestamp="2024-10-10T16:00:00Z", course_id="Sistemas_Operativos",
+             user_email="mike@iteso.mx", grade="6.0"):
+    return [user_email, course_id, "QUIZ", timestamp, activity_id, f"Completo el quiz del curso {course_id}", "50",
+            grade, "Macbook", "Jose", "jose@iteso.mx", "7.0"]
+
+
+def load(monkeypatch, tmp_path, tables, rows, failing_table=None, name="actividad.csv"):
+    # Carga incremental de `rows` sobre `tables`; el archivo fuente (y con él
+    # sus hashes) es el mismo entre llamadas con el mismo `name`
+    folder = tmp_path / str(id(tables))
+    folder.mkdir(exist_ok=True)
+    path = folder / name
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator="\n").writerows([HEADER] + rows)
+    session = MemorySession(tables, failing_table)
+    monkeypatch.setattr(loader, "connect_to_cassandra", lambda: session)
+    monkeypatch.setattr(loader, "write_leaderboard", lambda *args, **kwargs: None)
+    loader.load_cassandra_data(str(path), incremental=True)
+    return tables
+
+
+def snapshot(tables):
+    # Filas visibles: un contador en cero equivale a que no exista
+    visible = {}
+    for table, rows in tables.items():
+        rows = {key: row for key, row in rows.items() if row.get("views") != 0}
+        if rows:
+            visible[table] = rows
+    return visible
+
+
+def activity_ids(tables, table="student_activity"):
+    return sorted(str(row["activity_id"]) for row in tables.get(table, {}).values())
+
+
+def test_changed_primary_key_column_leaves_no_stale_rows(monkeypatch, tmp_path):
+    tables = load(monkeypatch, tmp_path, {}, [activity(A1)])
+    load(monkeypatch, tmp_path, tables, [activity(A1, timestamp="2024-11-05T09:00:00Z")])
+    assert [row["timestamp"].month for row in tables["student_activity"].values()] == [11]
+    assert [row["month"] for row in tables["student_activity_by_month"].values()] == ["2024-11"]
+    assert sorted(key[2] for key in tables["user_buckets"]) == ["2024-11", "2024-11"]
+    assert snapshot(tables) == snapshot(load(monkeypatch, tmp_path, {}, [activity(A1, timestamp="2024-11-05T09:00:00Z")]))
+
+
+def test_dropped_row_is_deleted_with_its_hash_and_view(monkeypatch, tmp_path):
+    tables = load(monkeypatch, tmp_path, {}, [activity(A1), activity(A2, timestamp="2024-10-11T16:00:00Z")])
+    load(monkeypatch, tmp_path, tables, [activity(A2, timestamp="2024-10-11T16:00:00Z")])
+    for table in ("student_activity", "student_activity_by_month"):
+        assert activity_ids(tables, table) == [A2]
+    assert [key[3] for key in tables["load_row_hashes"]] == [A2]
+    assert sum(row["views"] for row in tables["course_view_counts"].values()) == 1
+    assert snapshot(tables) == snapshot(load(monkeypatch, tmp_path, {}, [activity(A2, timestamp="2024-10-11T16:00:00Z")]))
+
+
+def test_shared_course_progress_row_is_kept_while_a_live_row_writes_it(monkeypatch, tmp_path):
+    second = activity(A2, timestamp="2024-10-11T16:00:00Z", grade="6.8")
+    tables = load(monkeypatch, tmp_path, {}, [activity(A1), second])
+    load(monkeypatch, tmp_path, tables, [second])
+    assert list(tables["course_progress"]) == [("mike@iteso.mx", "Sistemas_Operativos")]
+    assert list(tables["user_courses"]) == [("mike@iteso.mx", "Sistemas_Operativos")]
+    # Sin filas de mike ya nada escribe su progreso, su curso ni sus meses
+    load(monkeypatch, tmp_path, tables, [activity(A3, user_email="ana@iteso.mx")])
+    for table in ("course_progress", "course_performance", "user_courses", "user_buckets"):
+        assert {row["user_email"] for row in tables[table].values()} == {"ana@iteso.mx"}
+
+
+def test_cleanup_replayed_after_a_failure_matches_a_fresh_load(monkeypatch, tmp_path):
+    v2 = [activity(A1, course_id="Redes")]
+    tables = load(monkeypatch, tmp_path, {}, [activity(A1), activity(A2, timestamp="2024-10-11T16:00:00Z")])
+    load(monkeypatch, tmp_path, tables, v2, failing_table="student_activity")
+    # Los borrados fallaron: se conservan el hash de A2 y la versión anterior de A1
+    assert sorted(key[3] for key in tables["load_row_hashes"]) == sorted([A1, A2])
+    assert activity_ids(tables) == sorted([A1, A2])
+    load(monkeypatch, tmp_path, tables, v2)
+    fresh = snapshot(load(monkeypatch, tmp_path, {}, v2))
+    assert snapshot(tables) == fresh
+    # Repetir la carga ya depurada no cambia nada (ni descuenta vistas otra vez)
+    load(monkeypatch, tmp_path, tables, v2)
+    assert snapshot(tables) == fresh
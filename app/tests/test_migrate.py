@@ -0,0 +1,28 @@
+import time
+from cassandra_module.migrate import invalid_pairs
+
+
+def test_valid_mapping_has_no_problems():
+    assert invalid_pairs([("a@x.com", "b@x.com"), ("c@x.com", "d@x.com")]) == []
+
+
+def test_rejects_identity_chained_and_repeated_emails():
+    problems = dict(invalid_pairs([
+        ("a@x.com", "a@x.com"),
+        ("b@x.com", "c@x.com"), ("c@x.com", "d@x.com"),
+        ("e@x.com", "f@x.com"), ("e@x.com", "g@x.com"),
+    ]))
+    assert set(problems) == {("a@x.com", "a@x.com"), ("b@x.com", "c@x.com"),
+                             ("e@x.com", "f@x.com"), ("e@x.com", "g@x.com")}
+
+
+def test_rejects_two_sources_with_the_same_target():
+    problems = invalid_pairs([("a@x.com", "c@x.com"), ("b@x.com", "c@x.com")])
+    assert [pair for pair, _ in problems] == [("a@x.com", "c@x.com"), ("b@x.com", "c@x.com")]
+
+
+def test_large_mappings_are_validated_in_linear_time():
+    pairs = [(f"old{i}@x.com", f"new{i}@x.com") for i in range(100_000)]
+    started = time.monotonic()
+    assert invalid_pairs(pairs) == []
+    assert time.monotonic() - started < 2
@@ -0,0 +1,36 @@
+from collections import namedtuple
+from datetime import date
+from cassandra_module.view_counts import fetch_course_views
+
+Row = namedtuple("Row", ["hour", "views"])
+
+
+class CountingSession:
+    # Responde cada día con una fila y registra cuántas consultas hubo en vuelo
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def prepare(self, query):
+        return type("Prepared", (), {})()
+
+    def execute_async(self, statement, params=None, execution_profile=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        session, day = self, params[1]
+
+        class Future:
+            def result(self):
+                session.in_flight -= 1
+                return [Row(day.month, day.day)]
+        return Future()
+
+
+def test_course_views_keep_a_bounded_window_in_chronological_order():
+    session = CountingSession()
+    rows = fetch_course_views(session, "Redes", date(2024, 1, 1), date(2024, 12, 31), concurrency=8)
+    assert len(rows) == 366
+    assert [day for day, _, _ in rows] == sorted(day for day, _, _ in rows)
+    assert rows[0] == (date(2024, 1, 1), 1, 1)
+    assert session.max_in_flight == 8
@@ -0,0 +1,134 @@
+import threading
+import time
+from cassandra import OperationTimedOut, WriteTimeout, WriteType
+from cassandra.query import SimpleStatement
+from cassandra_module.writer import AsyncWriter, DeadLetterFile, PartitionBatcher, read_dead_letters
+
+
+class FakeFuture:
+
+    def __init__(self):
+        self.callbacks = None
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        self.callbacks = (callback, errback, callback_args, errback_args)
+
+    def succeed(self):
+        callback, _, args, _ = self.callbacks
+        callback(None, *args)
+
+    def fail(self, error):
+        _, errback, _, args = self.callbacks
+        errback(error, *args)
+
+
+class FakeSession:
+    # Guarda cada execute_async; las respuestas se resuelven desde el test,
+    # o de inmediato con `outcome` (None = éxito, excepción = error)
+
+    def __init__(self, outcome=False):
+        self.outcome = outcome
+        self.executed = []
+        self.pending = []
+        self._lock = threading.Lock()
+
+    def execute_async(self, statement, params=None, execution_profile=None):
+        future = FakeFuture()
+        with self._lock:
+            self.executed.append((statement, params))
+            if self.outcome is False:
+                self.pending.append(future)
+        if self.outcome is not False:
+            threading.Timer(0, self._resolve, (future,)).start()
+        return future
+
+    def _resolve(self, future):
+        while future.callbacks is None:
+            time.sleep(0.001)
+        if self.outcome is None:
+            future.succeed()
+        else:
+            future.fail(self.outcome)
+
+    def take_pending(self):
+        with self._lock:
+            pending, self.pending = self.pending, []
+        return pending
+
+
+def statement(idempotent):
+    return SimpleStatement("INSERT INTO ks.t (a) VALUES (%s)", is_idempotent=idempotent)
+
+
+def test_window_halves_once_per_burst_and_grows_back():
+    session = FakeSession()
+    writer = AsyncWriter(session, concurrency=8, max_retries=0, latency_threshold=60)
+    for i in range(8):
+        writer.submit("t", statement(True), (i,))
+    assert len(session.pending) == 8
+    pending = session.take_pending()
+    # Una ráfaga de timeouts reduce la ventana una sola vez
+    for future in pending[:4]:
+        future.fail(WriteTimeout("timeout", write_type=WriteType.SIMPLE))
+    assert writer.window == 4.0
+    for future in pending[4:]:
+        future.succeed()
+    # Crecimiento aditivo: una ventana completa de respuestas suma uno
+    for i in range(4):
+        writer.submit("t", statement(True), (i,))
+    for future in session.take_pending():
+        future.succeed()
+    assert 5.0 <= writer.window < 6.0
+    stats = writer.drain()
+    assert stats == {"t": {"ok": 8, "error": 4}}
+
+
+def test_idempotent_writes_are_retried_up_to_max_retries(tmp_path):
+    session = FakeSession(outcome=WriteTimeout("timeout", write_type=WriteType.SIMPLE))
+    dead_letter = DeadLetterFile(str(tmp_path / "dead.jsonl"))
+    writer = AsyncWriter(session, concurrency=4, max_retries=3, latency_threshold=0, dead_letter=dead_letter)
+    writer.submit("t", statement(True), (1,), items=[("insert_t", (1,))])
+    assert writer.drain() == {"t": {"ok": 0, "error": 1}}
+    assert len(session.executed) == 4
+    assert list(read_dead_letters(dead_letter.path)) == [("insert_t", (1,), False)]
+
+
+def test_non_idempotent_writes_are_not_retried(tmp_path):
+    session = FakeSession(outcome=OperationTimedOut())
+    dead_letter = DeadLetterFile(str(tmp_path / "dead.jsonl"))
+    writer = AsyncWriter(session, concurrency=4, max_retries=3, latency_threshold=0, dead_letter=dead_letter)
+    writer.submit("t", statement(False), (1,), items=[("update_t", (1,))])
+    assert writer.drain() == {"t": {"ok": 0, "error": 1}}
+    assert len(session.executed) == 1
+    # Un timeout de una escritura no idempotente pudo haberse aplicado
+    assert list(read_dead_letters(dead_letter.path)) == [("update_t", (1,), True)]
+
+
+def test_batch_with_a_non_idempotent_statement_is_not_retried():
+    session = FakeSession(outcome=WriteTimeout("timeout", write_type=WriteType.SIMPLE))
+    writer = AsyncWriter(session, concurrency=4, max_retries=3, latency_threshold=0)
+    batcher = PartitionBatcher(writer, batch_size=10)
+    batcher.add("t", "p", "insert_t", statement(True), (1,))
+    batcher.add("t", "p", "update_t", statement(False), (2,))
+    batcher.flush()
+    assert writer.drain() == {"t": {"ok": 0, "error": 2}}
+    assert len(session.executed) == 1
+
+
+def test_drain_waits_for_in_flight_writes():
+    session = FakeSession()
+    writer = AsyncWriter(session, concurrency=4)
+    for i in range(6):
+        writer.submit("t", statement(True), (i,))
+    result = {}
+    drainer = threading.Thread(target=lambda: result.update(writer.drain()))
+    drainer.start()
+    # Cuatro en vuelo y dos encoladas: drain() no puede volver todavía
+    for _ in range(2):
+        time.sleep(0.05)
+        assert drainer.is_alive()
+        for future in session.take_pending():
+            future.succeed()
+    drainer.join(timeout=2)
+    assert not drainer.is_alive()
+    assert result == {"t": {"ok": 6, "error": 0}}